@@ -1,23 +1,134 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import numpy as np
 import time
 import os
 import sys
 import re
 import csv
+import json
+import random
 import argparse
 import concurrent.futures
+from array import array
 from typing import Optional, List, Dict, Any, Tuple
 from scholarly import scholarly
+from openalex_snapshot import OpenAlexSnapshot, build_snapshot_index, compact_work
 
 # --- Configuration & Constants ---
 OPENALEX_API_URL = "https://api.openalex.org"
 CROSSREF_API_URL = "https://api.crossref.org/works"
+ORCID_API_URL = "https://pub.orcid.org/v3.0"
 MAX_WORKERS = 10 # For Crossref multithreading
+HTTP_RETRIES = 5 # Retries (with backoff) for transient HTTP errors
+HTTP_TIMEOUT = 30 # Seconds
+ORCID_BULK_SIZE = 100 # Max put-codes per ORCID bulk works request
+SCHOLAR_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "citation_map")
+SCHOLAR_CACHE_TTL = 7 * 24 * 3600 # Seconds before a cached Scholar profile is re-scraped
+SCHOLAR_FILL_WORKERS = 4 # Concurrent Scholar publication fills (kept low to avoid blocking)
+SCHOLAR_FILL_RETRIES = 3
+CROSSREF_NOT_FOUND = "Crossref (not found)" # DOI Source of titles Crossref had no match for
+DOI_PATTERN = re.compile(r'10\.\d{4,9}/[^\s"<>?#]+')
+
+# Output columns of the citation file, in order
+CITATION_COLUMNS = ['my_publication', 'cited_by_title', 'cited_by_author', 'cited_by_institution',
+                    'cited_by_country', 'cited_by_year', 'cited_by_date']
+
+
+class CitationRowStore:
+    """
+    Compact, column-oriented store for exploded citation rows.
+    Every string column is interned: each distinct value is kept once and rows
+    hold 4-byte integer codes, which become pandas Categoricals on export.
+    """
+    __slots__ = ('_codes', '_lookups', '_categories', '_years')
+
+    STRING_COLUMNS = [c for c in CITATION_COLUMNS if c != 'cited_by_year']
+
+    def __init__(self):
+        self._codes = {col: array('i') for col in self.STRING_COLUMNS}
+        self._lookups = {col: {} for col in self.STRING_COLUMNS}
+        self._categories = {col: [] for col in self.STRING_COLUMNS}
+        self._years = array('i') # 0 marks a missing year
+
+    def __len__(self) -> int:
+        return len(self._years)
+
+    def _intern(self, column: str, value) -> int:
+        """Helper: Return the integer code for `value`, -1 for missing values."""
+        if value is None:
+            return -1
+        lookup = self._lookups[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._categories[column])
+            self._categories[column].append(value)
+        return code
+
+    def append(self, my_publication, cited_by_title, cited_by_author, cited_by_institution,
+               cited_by_country, cited_by_year, cited_by_date):
+        """Add one exploded citation row."""
+        values = {
+            'my_publication': my_publication,
+            'cited_by_title': cited_by_title,
+            'cited_by_author': cited_by_author,
+            'cited_by_institution': cited_by_institution,
+            'cited_by_country': cited_by_country,
+            'cited_by_date': cited_by_date,
+        }
+        for col, value in values.items():
+            self._codes[col].append(self._intern(col, value))
+        self._years.append(cited_by_year or 0)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Build the output DataFrame; string columns stay categorical."""
+        data = {
+            col: pd.Categorical.from_codes(
+                np.frombuffer(self._codes[col], dtype=np.int32),
+                categories=self._categories[col]
+            )
+            for col in self.STRING_COLUMNS
+        }
+        years = pd.array(np.frombuffer(self._years, dtype=np.int32), dtype='Int64')
+        years[years == 0] = pd.NA
+        data['cited_by_year'] = years
+        return pd.DataFrame(data)[CITATION_COLUMNS]
+
 
 class CitationFetcher:
-    def __init__(self, email: Optional[str] = None):
+    def __init__(self, email: Optional[str] = None, snapshot: Optional[OpenAlexSnapshot] = None,
+                 scholar_cache_dir: Optional[str] = SCHOLAR_CACHE_DIR,
+                 scholar_cache_ttl: float = SCHOLAR_CACHE_TTL,
+                 scholar_fill: bool = False,
+                 response_cache: Optional[Any] = None):
+        """
+        email: Sent to the APIs for polite access.
+        snapshot: Answer all OpenAlex queries from a local snapshot index instead of the API.
+        scholar_cache_dir: Where Google Scholar profiles are cached (None disables the cache).
+        scholar_cache_ttl: Age in seconds after which a cached profile is scraped again.
+        scholar_fill: Fetch each new Scholar publication's detail page to look for a DOI.
+        response_cache: Dict-like store for complete OpenAlex query results, keyed by URL
+                        (e.g. shared across runs by a long-running service). Only the
+                        work fields run() reads are cached.
+        """
+        self.response_cache = response_cache
+        self.snapshot = snapshot
+        self.scholar_cache_dir = scholar_cache_dir
+        self.scholar_cache_ttl = scholar_cache_ttl
+        self.scholar_fill = scholar_fill
         self.session = requests.Session()
+        # Pooled connections, retried with exponential backoff on throttling/server errors
+        retry = Retry(
+            total=HTTP_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         if email:
             self.session.params = {'mailto': email}
         self.email = email
@@ -30,8 +141,22 @@ class CitationFetcher:
         """
         A helper function to handle OpenAlex API cursor pagination.
         It fetches all pages of results for a given URL.
+        With a local snapshot, the query is answered from its index instead.
         """
+        if self.snapshot is not None:
+            try:
+                return self.snapshot.get_works(url)
+            except Exception as e:
+                print(f"[Error] Snapshot query failed: {e} (URL: {url})")
+                return []
+
+        if self.response_cache is not None:
+            cached = self.response_cache.get(url)
+            if cached is not None:
+                return cached
+
         all_results = []
+        complete = True
         params = self.session.params.copy()
         params.update({'per_page': 200, 'cursor': '*'})
         
@@ -51,8 +176,12 @@ class CitationFetcher:
                 
             except requests.exceptions.RequestException as e:
                 print(f"[Error] API request failed: {e} (URL: {url})")
+                complete = False
                 break
                 
+        if self.response_cache is not None and complete:
+            # Never cache partial results; keep only the fields run() reads
+            self.response_cache[url] = [compact_work(work) for work in all_results]
         return all_results
 
     def _fetch_works_by_doi_batch(self, dois: List[str]) -> List[Dict[str, Any]]:
@@ -79,15 +208,31 @@ class CitationFetcher:
             
         return all_works
 
+    def _fetch_author(self, author_id: str) -> Dict[str, Any]:
+        """
+        Helper: Fetch an OpenAlex author object (API or local snapshot).
+        Raises on request errors or unknown authors.
+        """
+        if self.snapshot is not None:
+            author_data = self.snapshot.get_author(author_id, OPENALEX_API_URL)
+            if author_data is None:
+                raise LookupError(f"author {author_id} not found in the local snapshot")
+            return author_data
+            
+        response = self.session.get(f"{OPENALEX_API_URL}/authors/{author_id}")
+        response.raise_for_status()
+        return response.json()
+
 
     # =========================================================================
     # MODULE 2: Functions from fetch_pubs.py (ORCID, Scholar, Crossref)
     # =========================================================================
 
-    def _get_doi_info_from_crossref(self, title: str) -> Tuple[str, str]:
+    def _get_doi_info_from_crossref(self, title: str) -> Optional[Tuple[str, str]]:
         """
         Retrieve DOI and the matched title from Crossref API.
-        Returns: (doi, crossref_title)
+        Returns: (doi, crossref_title), ("", "") if Crossref has no match,
+        or None if the request itself failed (so the title can be retried).
         """
         if not title or len(title) < 5: return "", ""
         
@@ -95,18 +240,19 @@ class CitationFetcher:
         if self.email: params['mailto'] = self.email
 
         try:
-            response = requests.get(CROSSREF_API_URL, params=params, timeout=10)
-            if response.status_code == 200:
-                items = response.json().get('message', {}).get('items', [])
-                if items:
-                    item = items[0]
-                    doi = item.get('DOI', '')
-                    # Crossref returns titles as a list
-                    titles = item.get('title', [])
-                    found_title = titles[0] if titles else ""
-                    return doi, found_title
+            response = self.session.get(CROSSREF_API_URL, params=params, timeout=HTTP_TIMEOUT)
+            if response.status_code != 200:
+                return None
+            items = response.json().get('message', {}).get('items', [])
+            if items:
+                item = items[0]
+                doi = item.get('DOI', '')
+                # Crossref returns titles as a list
+                titles = item.get('title', [])
+                found_title = titles[0] if titles else ""
+                return doi, found_title
         except Exception:
-            pass
+            return None
         return "", ""
 
     def _normalize_doi_for_comparison(self, doi_str: str) -> str:
@@ -118,60 +264,237 @@ class CitationFetcher:
         return doi_str.strip().lower().replace("https://doi.org/", "").replace("http://doi.org/", "")
 
 
+    def _extract_orcid_doi(self, item: Dict[str, Any]) -> str:
+        """
+        Helper: Return the first DOI in an ORCID item's 'external-ids' block
+        (work summary, full work, or work group), or "" if there is none.
+        """
+        external_ids = (item.get("external-ids") or {}).get("external-id") or []
+        for eid in external_ids:
+            if eid.get("external-id-type") == "doi" and eid.get("external-id-value"):
+                return eid["external-id-value"]
+        return ""
+
+    def _fetch_orcid_work_dois(self, orcid_id: str, put_codes: List[int]) -> Dict[int, str]:
+        """
+        Helper: Fetch full work records via the ORCID bulk endpoint
+        (/works/{put-code,put-code,...}, up to 100 per call).
+        Returns a map of put-code -> DOI for the works that list one.
+        """
+        dois = {}
+        headers = {"Accept": "application/json"}
+        
+        for i in range(0, len(put_codes), ORCID_BULK_SIZE):
+            batch = put_codes[i:i + ORCID_BULK_SIZE]
+            url = f"{ORCID_API_URL}/{orcid_id}/works/{','.join(str(pc) for pc in batch)}"
+            try:
+                response = self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"[Warning] ORCID bulk works request failed: {e}")
+                continue
+                
+            for entry in response.json().get("bulk", []):
+                work = entry.get("work")
+                if not work: # Entries for unavailable works carry an 'error' instead
+                    continue
+                doi = self._extract_orcid_doi(work)
+                if doi:
+                    dois[work.get("put-code")] = doi
+        return dois
+
     def _fetch_orcid_data(self, orcid_id):
-        """Retrieve data from ORCID API."""
+        """
+        Retrieve data from ORCID API.
+        Looks for a DOI in every summary of each work group; groups without one
+        get their full work records fetched in bulk before falling back to Crossref.
+        """
         print(f"Fetching data from ORCID ID: {orcid_id}...")
-        url = f"https://pub.orcid.org/v3.0/{orcid_id}/works"
+        url = f"{ORCID_API_URL}/{orcid_id}/works"
         headers = {"Accept": "application/json"}
         
         results = []
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
             if response.status_code != 200: 
                 print(f"[Error] ORCID API returned status {response.status_code}")
                 return []
                 
             data = response.json()
+            missing_put_codes = {} # Row index -> put-codes of that group's summaries
             for group in data.get("group", []):
-                summary = group["work-summary"][0]
-                title = summary.get("title", {}).get("title", {}).get("value", "Unknown Title")
-                doi = ""
-                # Attempt to extract DOI from ORCID metadata
-                for eid in summary.get("external-ids", {}).get("external-id", []):
-                    if eid.get("external-id-type") == "doi":
-                        doi = eid.get("external-id-value")
+                summaries = group.get("work-summary") or []
+                if not summaries:
+                    continue
+                title = (summaries[0].get("title") or {}).get("title", {}).get("value", "Unknown Title")
+                
+                # Attempt to extract DOI from ORCID metadata (group first, then each summary)
+                doi = self._extract_orcid_doi(group)
+                for summary in summaries:
+                    if doi:
                         break
+                    doi = self._extract_orcid_doi(summary)
+                    
+                if not doi:
+                    missing_put_codes[len(results)] = [s["put-code"] for s in summaries if s.get("put-code")]
                 # Row format: [Original Title, DOI, ORCID source]
                 results.append([title, doi, "ORCID"])
                 
+            # Fill remaining gaps from the full work records
+            if missing_put_codes:
+                all_put_codes = [pc for codes in missing_put_codes.values() for pc in codes]
+                print(f"Fetching full ORCID records for {len(missing_put_codes)} works without a DOI...")
+                put_code_dois = self._fetch_orcid_work_dois(orcid_id, all_put_codes)
+                
+                found = 0
+                for index, codes in missing_put_codes.items():
+                    doi = next((put_code_dois[pc] for pc in codes if pc in put_code_dois), "")
+                    if doi:
+                        results[index][1] = doi
+                        found += 1
+                print(f"Found {found} more DOIs in full ORCID records.")
+                
         except Exception as e:
             print(f"[Error] accessing ORCID: {e}")
         
         return results
 
+    def _scholar_cache_path(self, scholar_id: str) -> str:
+        """Helper: Cache file for a Google Scholar profile."""
+        safe_id = re.sub(r'[^\w-]', '_', scholar_id)
+        return os.path.join(self.scholar_cache_dir, f"scholar_{safe_id}.json")
+
+    def _load_scholar_cache(self, scholar_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Helper: Load a cached Scholar profile:
+        {'fetched_at': <unix time>, 'publications': [[title, doi, doi_source], ...]}
+        """
+        if not self.scholar_cache_dir:
+            return None
+        try:
+            with open(self._scholar_cache_path(scholar_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_scholar_cache(self, scholar_id: str, data, fetched_at: Optional[float] = None):
+        """
+        Helper: Store Scholar rows (with any resolved DOIs) in the cache.
+        Without fetched_at, the time of the cached scrape is kept.
+        """
+        if not self.scholar_cache_dir:
+            return
+        if fetched_at is None:
+            cached = self._load_scholar_cache(scholar_id)
+            fetched_at = cached['fetched_at'] if cached else time.time()
+        try:
+            os.makedirs(self.scholar_cache_dir, exist_ok=True)
+            path = self._scholar_cache_path(scholar_id)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': fetched_at, 'publications': data}, f, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"[Warning] Could not write Google Scholar cache: {e}")
+
+    def _fill_scholar_publication(self, pub: Dict[str, Any]) -> str:
+        """
+        Helper: Fill one Scholar publication and look for a DOI in its links.
+        Retries with exponential backoff (plus jitter), since Scholar throttles bursts.
+        """
+        for attempt in range(SCHOLAR_FILL_RETRIES):
+            try:
+                filled = scholarly.fill(pub)
+                links = [filled.get('pub_url'), filled.get('eprint_url'), filled.get('bib', {}).get('doi')]
+                for link in links:
+                    match = DOI_PATTERN.search(link) if isinstance(link, str) else None
+                    if match:
+                        return match.group(0)
+                return ""
+            except Exception:
+                if attempt < SCHOLAR_FILL_RETRIES - 1:
+                    time.sleep(2 ** attempt + random.random())
+        return ""
+
+    def _fill_scholar_publications(self, pubs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Helper: Fill publications concurrently in a small, bounded pool.
+        Returns one DOI (or "") per publication.
+        """
+        print(f"Filling {len(pubs)} new Google Scholar publications...")
+        dois = [""] * len(pubs)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SCHOLAR_FILL_WORKERS) as executor:
+            future_to_index = {executor.submit(self._fill_scholar_publication, pub): i for i, pub in enumerate(pubs)}
+            for count, future in enumerate(concurrent.futures.as_completed(future_to_index)):
+                dois[future_to_index[future]] = future.result()
+                print(f"\rProgress: {count + 1}/{len(pubs)}", end='', flush=True)
+        print()
+        return dois
+
     def _fetch_scholar_data(self, scholar_id):
-        """Retrieve data from Google Scholar."""
+        """
+        Retrieve data from Google Scholar.
+        A cached profile younger than the TTL is used as is, including titles
+        Crossref already failed to match. Otherwise the profile is scraped again and
+        compared with the cache: only new and previously unresolved titles need a DOI.
+        """
+        cached = self._load_scholar_cache(scholar_id)
+        if cached and time.time() - cached['fetched_at'] < self.scholar_cache_ttl:
+            age_hours = (time.time() - cached['fetched_at']) / 3600
+            print(f"Using cached Google Scholar profile for {scholar_id} ({age_hours:.1f} hours old).")
+            return [list(row) for row in cached['publications']]
+        
         print(f"Fetching publication list from Google Scholar ID: {scholar_id}...")
         try:
             author = scholarly.search_author_id(scholar_id)
             scholarly.fill(author, sections=['publications'])
             pubs = author['publications']
-            
-            # Initialize with empty DOIs and empty DOI Source
-            # Row format: [Original Title, DOI, DOI Source]
-            return [[p['bib'].get('title'), "", ""] for p in pubs]
-            
         except Exception as e:
             print(f"[Error] accessing Google Scholar: {e}")
+            if cached:
+                print("Falling back to the cached (expired) Google Scholar profile.")
+                return [list(row) for row in cached['publications']]
             return []
+        
+        # Reuse DOIs found for titles seen in the previous scrape
+        known = {}
+        if cached:
+            known = {str(row[0]).strip().lower(): row for row in cached['publications']}
+            
+        # Row format: [Original Title, DOI, DOI Source]
+        data, new_pubs, new_rows = [], [], []
+        for p in pubs:
+            title = p['bib'].get('title')
+            previous = known.get(str(title).strip().lower())
+            if previous and previous[1]:
+                data.append([title, previous[1], previous[2]])
+            elif previous:
+                # Unresolved last time: give Crossref another try once per cache expiry
+                data.append([title, "", ""])
+            else:
+                # Initialize with empty DOIs and empty DOI Source
+                row = [title, "", ""]
+                data.append(row)
+                new_pubs.append(p)
+                new_rows.append(row)
+        if cached:
+            print(f"{len(new_rows)} new publications since the last scrape.")
+
+        if self.scholar_fill and new_pubs:
+            for row, doi in zip(new_rows, self._fill_scholar_publications(new_pubs)):
+                if doi:
+                    row[1], row[2] = doi, "Google Scholar"
+            
+        self._save_scholar_cache(scholar_id, data, fetched_at=time.time())
+        return data
 
     def _resolve_missing_dois(self, data):
         """
         Scans data for missing DOIs and fetches them via Crossref.
         Updates data in-place with found DOI and the Crossref title for verification.
+        Titles Crossref has no match for are marked CROSSREF_NOT_FOUND and skipped later.
         """
-        # Indices where DOI is missing (index 1 is DOI)
-        missing_indices = [i for i, row in enumerate(data) if not row[1]]
+        # Indices where DOI is missing (index 1 is DOI) and not already tried
+        missing_indices = [i for i, row in enumerate(data) if not row[1] and row[2] != CROSSREF_NOT_FOUND]
         total_missing = len(missing_indices)
 
         if total_missing == 0:
@@ -189,10 +512,14 @@ class CitationFetcher:
             for count, future in enumerate(concurrent.futures.as_completed(future_to_index)):
                 index = future_to_index[future]
                 try:
-                    found_doi, found_title = future.result()
-                    if found_doi:
-                        data[index][1] = found_doi
-                        data[index][2] = f"Crossref ({found_title})" # Store source
+                    result = future.result()
+                    if result is not None: # None: request failed, leave untried
+                        found_doi, found_title = result
+                        if found_doi:
+                            data[index][1] = found_doi
+                            data[index][2] = f"Crossref ({found_title})" # Store source
+                        else:
+                            data[index][2] = CROSSREF_NOT_FOUND
                 except Exception:
                     pass
                 print(f"\rProgress: {count + 1}/{total_missing}", end='', flush=True)
@@ -205,20 +532,24 @@ class CitationFetcher:
     # MODULE 3: Integrated Workflow
     # =========================================================================
 
-    def run(self, source_type: str, source_value: str, output_csv: str):
+    def run(self, source_type: str, source_value: str, output_csv: str,
+            pub_list_filename: Optional[str] = None) -> bool:
         """
         Main execution logic combining fetch_pubs and fetch_citation_info flows.
+        pub_list_filename overrides the intermediate publication list's default name.
+        Returns True once the citation file has been written, False otherwise.
         """
         my_publications = [] # This will store OpenAlex work objects
         
         # Determine intermediate filename based on source
-        pub_list_filename = "publications_with_doi.csv" # Default fallback
-        if source_type == 'orcid':
-            pub_list_filename = "publications_with_doi_orcid.csv"
-        elif source_type == 'scholar':
-            pub_list_filename = "publications_with_doi_scholar.csv"
-        elif source_type == 'openalex':
-            pub_list_filename = "publications_with_doi_openalex.csv"
+        if not pub_list_filename:
+            pub_list_filename = "publications_with_doi.csv" # Default fallback
+            if source_type == 'orcid':
+                pub_list_filename = "publications_with_doi_orcid.csv"
+            elif source_type == 'scholar':
+                pub_list_filename = "publications_with_doi_scholar.csv"
+            elif source_type == 'openalex':
+                pub_list_filename = "publications_with_doi_openalex.csv"
         
         # ---------------------------------------------------------------------
         # PHASE 1: Acquire Publication Data (ID -> List of DOIs)
@@ -237,10 +568,11 @@ class CitationFetcher:
             
             if not data:
                 print("No data found from source. Exiting.")
-                return
-
+                return False
             # 2. Fill Missing DOIs and Crossref Titles
             data = self._resolve_missing_dois(data)
+            if source_type == 'scholar':
+                self._save_scholar_cache(source_value, data) # Keep resolved DOIs for the next run
             data.sort(key=lambda x: str(x[0]).lower())
 
             # 3. Save intermediate file (as fetch_pubs did)
@@ -253,8 +585,7 @@ class CitationFetcher:
                 print(f"Proceeding to fetch citations using DOIs from this list...")
             except IOError as e:
                 print(f"[Error] File I/O Error: {e}")
-                return
-
+                return False
             # 4. Prepare data for OpenAlex step (simulate CSV input)
             # Extract only the DOIs that were found
             input_doi_list = [row[1] for row in data if row[1]]
@@ -268,8 +599,7 @@ class CitationFetcher:
             input_source = source_value
             if not os.path.exists(input_source):
                 print(f"[Error] CSV file not found: {input_source}")
-                return
-            
+                return False
             print(f"Reading CSV: {input_source}")
             df = pd.read_csv(input_source)
             
@@ -278,8 +608,7 @@ class CitationFetcher:
             
             if not doi_col:
                 print("[Error] CSV must contain a 'DOI' or 'doi' column.")
-                return
-                
+                return False
             # Extract DOIs
             raw_doi_list = df[doi_col].astype(str).tolist()
             
@@ -317,19 +646,15 @@ class CitationFetcher:
             author_id = source_value.strip()
             print(f"\nFetching author details for ID: {author_id}")
             
-            author_url = f"{OPENALEX_API_URL}/authors/{author_id}"
             try:
-                response = self.session.get(author_url)
-                response.raise_for_status()
-                author_data = response.json()
+                author_data = self._fetch_author(author_id)
             
                 print(f"Author found: {author_data.get('display_name', 'Unknown')}")
                 
                 works_api_url = author_data.get('works_api_url')
                 if not works_api_url:
                     print(f"[Error] Could not find 'works_api_url' for author ID: {author_id}")
-                    return
-
+                    return False
                 print(f"Fetching works from: {works_api_url}")
 
                 # --- Step 2: Get all publications for the author ---
@@ -358,14 +683,13 @@ class CitationFetcher:
 
             except Exception as e:
                 print(f"[Error] fetching OpenAlex Author: {e}")
-                return
-
+                return False
         # ---------------------------------------------------------------------
         # PHASE 2: Fetch Citations (Common Logic)
         # ---------------------------------------------------------------------
 
         print(f"\nProcessing citations for {len(my_publications)} publications...")
-        all_rows = []
+        citation_rows = CitationRowStore()
 
         # --- Step 3: Iterate through each publication to get its citations ---
         for i, my_pub in enumerate(my_publications):
@@ -398,17 +722,14 @@ class CitationFetcher:
             for citing_paper in citing_papers:
                 # Internal key 'title'
                 citing_title = citing_paper.get('title', 'N/A')
+                citing_year = citing_paper.get('publication_year')
+                citing_date = citing_paper.get('publication_date')
                 authorships = citing_paper.get('authorships', [])
                 
                 # Helper to add row
                 def add_row(author_name, inst_name, country_code):
-                    all_rows.append({
-                        'my_publication': my_pub_title,
-                        'cited_by_title': citing_title,
-                        'cited_by_author': author_name,
-                        'cited_by_institution': inst_name,
-                        'cited_by_country': country_code
-                    })
+                    citation_rows.append(my_pub_title, citing_title, author_name, inst_name,
+                                         country_code, citing_year, citing_date)
 
                 if not authorships:
                     add_row('N/A', 'N/A', 'N/A')
@@ -428,27 +749,28 @@ class CitationFetcher:
                     for inst in institutions:
                         add_row(author_name, inst.get('display_name', 'N/A'), inst.get('country_code', 'N/A'))
 
-        # --- Step 5: Export all collected data to a CSV ---
-        if not all_rows:
+        # --- Step 5: Export all collected data to a CSV (or Parquet) ---
+        if not len(citation_rows):
             print("No citation data found.")
-            return
-            
-        
-        
-        # Create DataFrame using Pandas
-        out_df = pd.DataFrame(all_rows)
-        
-        # Reorder columns to match the user's request
-        cols = ['my_publication', 'cited_by_title', 'cited_by_author', 'cited_by_institution', 'cited_by_country']
-        out_df = out_df[cols]
+            return False
+        # Create DataFrame using Pandas; text columns stay categorical
+        out_df = citation_rows.to_dataframe()
         
         try:
-            # Use 'utf-8-sig' encoding to ensure Excel handles non-English characters correctly
-            out_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
+            if output_csv.lower().endswith('.parquet'):
+                # Categorical columns are stored dictionary-encoded
+                out_df.to_parquet(output_csv, index=False)
+            else:
+                # Use 'utf-8-sig' encoding to ensure Excel handles non-English characters correctly
+                out_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
             print(f"\n[Success] Generated {len(out_df)} rows.")
             print(f"Citation info saved to: {output_csv}\n")
+            return True
+        except ImportError as e:
+            print(f"[Error] Writing Parquet requires 'pyarrow' (pip install pyarrow): {e}")
         except Exception as e:
             print(f"[Error] Saving CSV: {e}")
+        return False
 
 
 # =============================================================================
@@ -464,13 +786,34 @@ if __name__ == "__main__":
     group.add_argument("--scholar_id", help="Your Google Scholar ID")
     group.add_argument("--csv", help="Path to a CSV file containing a 'DOI' or 'doi' column")
 
-    parser.add_argument("--output", default="citation_info.csv", help="Output CSV filename (default: citation_info.csv)")
+    parser.add_argument("--output", default="citation_info.csv", help="Output CSV filename; use a .parquet extension for Parquet (default: citation_info.csv)")
     parser.add_argument("--email", help="Your email for API politeness (Recommended)")
+    parser.add_argument("--scholar_cache_ttl", type=float, default=SCHOLAR_CACHE_TTL / 3600,
+                        help="Hours before a cached Google Scholar profile is scraped again (default: 168; 0 always re-scrapes)")
+    parser.add_argument("--scholar_fill", action="store_true",
+                        help="Look up each new Google Scholar publication's page for a DOI before using Crossref (slower)")
+    parser.add_argument("--snapshot_index", help="Answer OpenAlex queries from this local snapshot index (SQLite file)")
+    parser.add_argument("--snapshot_dir", help="OpenAlex works snapshot (JSONL.gz) to build --snapshot_index from, if it does not exist yet")
 
     args = parser.parse_args()
 
+    # Optional offline backend
+    snapshot = None
+    if args.snapshot_index:
+        if not os.path.exists(args.snapshot_index):
+            if not args.snapshot_dir:
+                print(f"[Error] Snapshot index not found: {args.snapshot_index} (use --snapshot_dir to build it)")
+                sys.exit(1)
+            build_snapshot_index(args.snapshot_dir, args.snapshot_index)
+        snapshot = OpenAlexSnapshot(args.snapshot_index)
+
     # Instantiate the fetcher
-    fetcher = CitationFetcher(email=args.email)
+    fetcher = CitationFetcher(
+        email=args.email,
+        snapshot=snapshot,
+        scholar_cache_ttl=args.scholar_cache_ttl * 3600,
+        scholar_fill=args.scholar_fill,
+    )
 
     # Determine source type and value
     if args.openalex_id:
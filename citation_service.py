@@ -0,0 +1,426 @@
+import os
+import sys
+import json
+import time
+import queue
+import uuid
+import shutil
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Any
+
+import matplotlib
+matplotlib.use('Agg') # The service never needs an interactive backend
+
+import citation_fetcher
+from citation_fetcher import CitationFetcher
+from create_citation_map import create_citation_map, load_world_map
+from openalex_snapshot import OpenAlexSnapshot
+
+# --- Configuration & Constants ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_WORKERS = 2
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024 # Approximate memory budget for cached OpenAlex results
+RESPONSE_CACHE_TTL = 6 * 3600 # Seconds before a cached query result is fetched again
+MAX_FINISHED_JOBS = 1000 # Finished job records kept for status queries
+LATENCY_WINDOW = 500 # Recent jobs used for latency metrics
+VALID_SOURCE_TYPES = ['openalex', 'orcid', 'scholar', 'csv']
+
+
+def _approximate_size(value) -> int:
+    """Helper: Rough in-memory size of a cached value, from its compact JSON encoding."""
+    return len(json.dumps(value, separators=(',', ':'), default=str))
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping with expiring entries and an approximate
+    byte budget, used as the fetcher's response cache.
+    Values larger than the whole budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._data = OrderedDict() # key -> (stored_at, size, value)
+        self._lock = threading.Lock()
+
+    def _discard(self, key):
+        """Helper: Remove an entry (lock held)."""
+        _, size, _ = self._data.pop(key)
+        self.total_bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if time.time() - entry[0] > self.ttl:
+                self._discard(key)
+                return default
+            self._data.move_to_end(key)
+            return entry[2]
+
+    def __setitem__(self, key, value):
+        size = _approximate_size(value)
+        with self._lock:
+            if key in self._data:
+                self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (time.time(), size, value)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._discard(next(iter(self._data))) # Least recently used first
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class CitationService:
+    """
+    Resident job runner for fetch and render jobs.
+    Keeps one fetcher (pooled HTTP sessions, response cache) and the world map
+    warm, runs jobs from a bounded queue, and coalesces duplicate in-flight jobs.
+
+    Job specs:
+      {"type": "fetch", "source_type": "openalex|orcid|scholar|csv", "source_value": "...", "output": "citation_info.csv"}
+      {"type": "render", "csv": "citation_info.csv", "output": "citation_map.png", "options": {...create_citation_map kwargs}}
+    """
+
+    def __init__(self, fetcher: CitationFetcher, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 num_workers: int = DEFAULT_WORKERS):
+        self.fetcher = fetcher
+        if self.fetcher.response_cache is None:
+            self.fetcher.response_cache = LRUCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.num_workers = num_workers
+
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock() # pyplot is not thread-safe
+        self.jobs = OrderedDict() # job_id -> job record
+        self._in_flight = {} # coalescing key -> job_id (queued or running)
+        self._latencies = deque(maxlen=LATENCY_WINDOW) # (queue_wait, run_time) of finished jobs
+        self.counters = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+        self.started_at = time.time()
+
+    # =========================================================================
+    # Lifecycle
+    # =========================================================================
+
+    def start(self):
+        """Warm the world map and start the worker threads."""
+        try:
+            load_world_map()
+            print("World map loaded.")
+        except Exception as e:
+            print(f"[Warning] Could not preload world map (renders will retry): {e}")
+
+        for i in range(self.num_workers):
+            threading.Thread(target=self._worker, name=f"citation-worker-{i}", daemon=True).start()
+
+    # =========================================================================
+    # Job Submission & Status
+    # =========================================================================
+
+    def _validate(self, spec: Dict[str, Any]) -> tuple:
+        """Helper: Check a job spec and return its coalescing key. Raises ValueError."""
+        job_type = spec.get('type')
+        output = spec.get('output')
+        if job_type == 'fetch':
+            if spec.get('source_type') not in VALID_SOURCE_TYPES:
+                raise ValueError(f"'source_type' must be one of {VALID_SOURCE_TYPES}")
+            if not isinstance(spec.get('source_value'), str) or not spec['source_value'].strip():
+                raise ValueError("'source_value' is required")
+            if output is not None and not isinstance(output, str):
+                raise ValueError("'output' must be a string")
+            output = output or 'citation_info.csv'
+            spec['output'] = output
+            # Fetches for the same source share one run, whatever their output name
+            source_value = spec['source_value'].strip()
+            if spec['source_type'] == 'csv':
+                source_value = os.path.abspath(source_value)
+            return ('fetch', spec['source_type'], source_value, output.lower().endswith('.parquet'))
+        if job_type == 'render':
+            if not isinstance(spec.get('csv'), str) or not spec['csv']:
+                raise ValueError("'csv' is required")
+            options = spec.get('options') or {}
+            if not isinstance(options, dict):
+                raise ValueError("'options' must be an object")
+            if output is not None and not isinstance(output, str):
+                raise ValueError("'output' must be a string")
+            output = output or 'citation_map.png'
+            spec['output'], spec['options'] = output, options
+            return ('render', os.path.abspath(spec['csv']), os.path.abspath(output),
+                    json.dumps(options, sort_keys=True))
+        raise ValueError("'type' must be 'fetch' or 'render'")
+
+    def submit(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job. Returns its record; an identical job that is still queued
+        or running is returned instead of queueing a duplicate. A fetch for the
+        same source with another output joins that job, and the result is
+        copied to its output once the fetch is done.
+        Raises ValueError for invalid specs and queue.Full when the queue is full.
+        """
+        key = self._validate(spec)
+        with self._lock:
+            existing_id = self._in_flight.get(key)
+            if existing_id is not None:
+                existing = self.jobs[existing_id]
+                if spec['type'] == 'fetch':
+                    outputs = existing['outputs']
+                    if os.path.abspath(spec['output']) not in map(os.path.abspath, outputs):
+                        outputs.append(spec['output'])
+                self.counters['coalesced'] += 1
+                return dict(existing, outputs=list(existing['outputs']), coalesced=True)
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'spec': spec,
+                'outputs': [spec['output']], # Joined fetches add their outputs here
+                'status': 'queued',
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+            }
+            try:
+                self.queue.put_nowait((key, job['id']))
+            except queue.Full:
+                self.counters['rejected'] += 1
+                raise
+            self.jobs[job['id']] = job
+            self._in_flight[key] = job['id']
+            self.counters['submitted'] += 1
+            return dict(job, outputs=list(job['outputs']), coalesced=False)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job, outputs=list(job['outputs'])) if job else None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, job counters and latency of recent jobs (seconds)."""
+        with self._lock:
+            latencies = list(self._latencies)
+            running = sum(1 for job in self.jobs.values() if job['status'] == 'running')
+            metrics = {
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'running': running,
+                'workers': self.num_workers,
+                'response_cache_entries': len(self.fetcher.response_cache),
+                'response_cache_bytes': getattr(self.fetcher.response_cache, 'total_bytes', None),
+                **self.counters,
+            }
+
+        def percentile(values, q):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q * len(values)))], 3) if values else None
+
+        waits = [w for w, _ in latencies]
+        totals = [w + r for w, r in latencies]
+        metrics['latency'] = {
+            'samples': len(latencies),
+            'queue_wait_avg_s': round(sum(waits) / len(waits), 3) if waits else None,
+            'run_avg_s': round(sum(r for _, r in latencies) / len(latencies), 3) if latencies else None,
+            'total_p50_s': percentile(totals, 0.5),
+            'total_p95_s': percentile(totals, 0.95),
+        }
+        return metrics
+
+    # =========================================================================
+    # Workers
+    # =========================================================================
+
+    def _execute(self, spec: Dict[str, Any]):
+        """
+        Helper: Run one job. Raises RuntimeError if no output was produced.
+        Returns the files a fetch wrote (citation file, publication list).
+        """
+        if spec['type'] == 'fetch':
+            root = os.path.splitext(spec['output'])[0]
+            ok = self.fetcher.run(
+                source_type=spec['source_type'],
+                source_value=spec['source_value'].strip(),
+                output_csv=spec['output'],
+                pub_list_filename=f"{root}_publications.csv", # Per-job file, so jobs never overwrite each other
+            )
+            if not ok:
+                raise RuntimeError("fetch produced no citation file (see service log)")
+            return [spec['output'], f"{root}_publications.csv"]
+        else:
+            with self._render_lock:
+                saved = create_citation_map(spec['csv'], output_filename=spec['output'], **spec['options'])
+            if not saved:
+                raise RuntimeError("render produced no map (see service log)")
+
+    @staticmethod
+    def _copy_fetch_result(written: list, output: str):
+        """Helper: Copy a finished fetch's citation file and publication list to another job output."""
+        root = os.path.splitext(output)[0]
+        for source, target in zip(written, [output, f"{root}_publications.csv"]):
+            if os.path.exists(source) and os.path.abspath(source) != os.path.abspath(target):
+                shutil.copyfile(source, target)
+
+    def _worker(self):
+        while True:
+            key, job_id = self.queue.get()
+            with self._lock:
+                job = self.jobs[job_id]
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+
+            error = None
+            try:
+                written = self._execute(job['spec'])
+                if written:
+                    # Stop accepting joiners, then serve every output that joined this fetch
+                    with self._lock:
+                        self._release(key, job_id)
+                        extra_outputs = job['outputs'][1:]
+                    for output in extra_outputs:
+                        self._copy_fetch_result(written, output)
+            except Exception as e:
+                error = str(e)
+
+            with self._lock:
+                job['finished_at'] = time.time()
+                job['status'] = 'failed' if error else 'done'
+                job['error'] = error
+                self.counters['failed' if error else 'completed'] += 1
+                self._latencies.append((job['started_at'] - job['submitted_at'],
+                                        job['finished_at'] - job['started_at']))
+                self._release(key, job_id)
+                self._prune_finished_jobs()
+            self.queue.task_done()
+
+    def _release(self, key: tuple, job_id: str):
+        """Helper: Stop coalescing new submissions into this job (lock held)."""
+        if self._in_flight.get(key) == job_id:
+            del self._in_flight[key]
+
+    def _prune_finished_jobs(self):
+        """Helper: Drop the oldest finished job records beyond MAX_FINISHED_JOBS (lock held)."""
+        finished = [job_id for job_id, job in self.jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+
+# =============================================================================
+# HTTP API
+# =============================================================================
+
+def make_handler(service: CitationService):
+    """Build the request handler class bound to a service instance."""
+
+    class CitationServiceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif self.path == '/metrics':
+                self._send_json(200, service.metrics())
+            elif self.path.startswith('/jobs/'):
+                job = service.get_job(self.path[len('/jobs/'):])
+                if job is None:
+                    self._send_json(404, {'error': 'job not found'})
+                else:
+                    self._send_json(200, job)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/jobs':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                spec = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(spec, dict):
+                    raise ValueError("job spec must be a JSON object")
+                job = service.submit(spec)
+            except queue.Full:
+                self._send_json(503, {'error': 'job queue is full, retry later'})
+                return
+            except ValueError as e: # Includes malformed JSON
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200 if job['coalesced'] else 202, job)
+
+        def log_message(self, format, *args):
+            pass # Job progress is already printed by the fetcher and map modules
+
+    return CitationServiceHandler
+
+
+def configure_upstreams(openalex_url: Optional[str] = None, orcid_url: Optional[str] = None,
+                        crossref_url: Optional[str] = None):
+    """Point the fetcher at other API base URLs (e.g. local stand-ins for testing)."""
+    if openalex_url:
+        citation_fetcher.OPENALEX_API_URL = openalex_url.rstrip('/')
+    if orcid_url:
+        citation_fetcher.ORCID_API_URL = orcid_url.rstrip('/')
+    if crossref_url:
+        citation_fetcher.CROSSREF_API_URL = crossref_url.rstrip('/')
+
+
+def serve(service: CitationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Start the service workers and serve the HTTP API until interrupted."""
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Citation service listening on http://{host}:{server.server_address[1]} "
+          f"({service.num_workers} workers, queue size {service.queue.maxsize})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
+
+# =============================================================================
+# COMMAND LINE INTERFACE
+# =============================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run citation fetch/render jobs as a local HTTP service.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Concurrent jobs (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--queue_size", type=int, default=DEFAULT_QUEUE_SIZE, help=f"Max queued jobs (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--email", help="Your email for API politeness (Recommended)")
+    parser.add_argument("--snapshot_index", help="Answer OpenAlex queries from this local snapshot index (SQLite file)")
+    parser.add_argument("--openalex_url", help="Override the OpenAlex API base URL (e.g. a local stand-in for testing)")
+    parser.add_argument("--orcid_url", help="Override the ORCID API base URL (default: https://pub.orcid.org/v3.0)")
+    parser.add_argument("--crossref_url", help="Override the Crossref works endpoint (default: https://api.crossref.org/works)")
+
+    args = parser.parse_args()
+
+    configure_upstreams(args.openalex_url, args.orcid_url, args.crossref_url)
+
+    snapshot = None
+    if args.snapshot_index:
+        try:
+            snapshot = OpenAlexSnapshot(args.snapshot_index)
+        except FileNotFoundError as e:
+            print(f"[Error] {e}")
+            sys.exit(1)
+
+    fetcher = CitationFetcher(email=args.email, snapshot=snapshot)
+    serve(CitationService(fetcher, queue_size=args.queue_size, num_workers=args.workers),
+          host=args.host, port=args.port)
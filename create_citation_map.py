@@ -3,8 +3,14 @@ import geopandas
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import matplotlib.patheffects as PathEffects
+import matplotlib.animation as animation
+import matplotlib.colors as mcolors
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
 import numpy as np
 import os
+import time
+import concurrent.futures
 
 try:
     from adjustText import adjust_text
@@ -15,8 +21,145 @@ except ImportError:
         print("Warning: 'adjustText' not installed. Skipping label adjustment.")
         pass
 
+# --- Configuration & Constants ---
+WORLD_MAP_URL = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip"
+
+# World layer cached per process, so repeated maps (and pool workers) load it once
+_WORLD_CACHE = None
+_COUNTRY_INDEX_CACHE = None
+
+# Natural Earth marks some countries' iso_a2 as '-99' (e.g. France, Norway).
+# Fallbacks for layers that also lack a usable iso_a2_eh, keyed by adm0_a3.
+_ADM0_A3_TO_ISO2 = {'FRA': 'FR', 'NOR': 'NO', 'KOS': 'XK'}
+
+# Vector (.svg/.pdf) output: drop vertex detail finer than this many points at print size
+VECTOR_SIMPLIFY_POINTS = 0.5
+FIGURE_SIZE = (16, 9) # Inches
+
+# Country codes in the citation data that mean "unknown" rather than a country
+_MISSING_COUNTRY_CODES = {'', 'N/A', 'NAN', 'NONE'}
+
+
+def load_world_map():
+    """
+    Load the Natural Earth world layer (without Antarctica) once per process.
+    Later calls return the cached GeoDataFrame; callers must not modify it in place.
+    The ISO-2 lookup index for the layer is built alongside it.
+    """
+    global _WORLD_CACHE, _COUNTRY_INDEX_CACHE
+    if _WORLD_CACHE is None:
+        world = geopandas.read_file(WORLD_MAP_URL)
+        # Robustness: Convert column names to lowercase
+        world.columns = world.columns.str.lower()
+        world = world[world.name != "Antarctica"].reset_index(drop=True) # Filter out Antarctica
+        _WORLD_CACHE = world
+        _COUNTRY_INDEX_CACHE = build_country_index(world)
+    return _WORLD_CACHE
+
+
+def _normalize_country_code(code) -> str:
+    """Helper: Upper-case and strip a country code, mapping missing values to ''."""
+    if not isinstance(code, str):
+        return ""
+    return code.strip().upper()
+
+
+def build_country_index(world: geopandas.GeoDataFrame) -> dict:
+    """
+    Map ISO-2 country codes (as used by OpenAlex) to row positions in `world`.
+    Every row's iso_a2 is used first, then iso_a2_eh, then adm0_a3, so a
+    fallback code never takes a country code that another row holds in iso_a2.
+    """
+    passes = []
+    for column in ('iso_a2', 'iso_a2_eh'):
+        if column in world.columns:
+            passes.append([_normalize_country_code(code) for code in world[column]])
+    if 'adm0_a3' in world.columns:
+        passes.append([_ADM0_A3_TO_ISO2.get(_normalize_country_code(code), "") for code in world['adm0_a3']])
+
+    index = {}
+    for codes in passes:
+        for pos, code in enumerate(codes):
+            # Skip placeholders like '-99' and never overwrite an earlier match
+            if len(code) == 2 and code.isalpha() and code not in index:
+                index[code] = pos
+    return index
+
+
+def get_country_index(world: geopandas.GeoDataFrame) -> dict:
+    """Return the ISO-2 lookup for `world`, reusing the cached one for the cached layer."""
+    if world is _WORLD_CACHE and _COUNTRY_INDEX_CACHE is not None:
+        return _COUNTRY_INDEX_CACHE
+    return build_country_index(world)
+
+
+def compute_country_counts(df: pd.DataFrame, world: geopandas.GeoDataFrame) -> np.ndarray:
+    """
+    Count citations per country, aligned to the rows of `world`.
+    Returns an integer array with one entry per world country.
+    Country codes that match no country on the map are reported.
+    """
+    country_index = get_country_index(world)
+    # Count the (few) distinct codes first, then scatter-add them into position
+    code_counts = df['cited_by_country'].map(_normalize_country_code).value_counts()
+    code_counts = code_counts[code_counts > 0] # Categoricals also list unused categories
+
+    positions = np.fromiter(
+        (country_index.get(code, -1) for code in code_counts.index),
+        dtype=np.intp,
+        count=len(code_counts)
+    ) # Explicit dtype: an empty index would otherwise map to an object array
+    matched = positions >= 0
+    counts = np.zeros(len(world), dtype=np.int64)
+    np.add.at(counts, positions[matched], code_counts.to_numpy()[matched])
+
+    unmatched = code_counts[~matched]
+    unmatched = unmatched[~unmatched.index.isin(_MISSING_COUNTRY_CODES)]
+    if not unmatched.empty:
+        details = ", ".join(f"{code} ({n})" for code, n in unmatched.items())
+        print(f"Info: {unmatched.sum()} citations have country codes not on the map: {details}")
+    return counts
+
+
+def _scale_counts(counts: np.ndarray, scale: str) -> np.ndarray:
+    """
+    Apply the master scale to a count vector. Uncited countries stay at 0 and
+    rank scales use dense ranks among cited countries only (starting at 1).
+    """
+    counts = np.asarray(counts)
+    if scale == 'linear':
+        return counts.astype(float)
+    if scale == 'log':
+        return np.log1p(counts.astype(float))
+
+    scaled = np.zeros(counts.shape, dtype=float)
+    cited = counts > 0
+    if cited.any():
+        scaled[cited] = np.unique(counts[cited], return_inverse=True)[1] + 1
+    if scale == 'log_rank':
+        scaled = np.log1p(scaled)
+    return scaled
+
+
+def _read_citation_csv(csv_filepath: str, columns: tuple = ('cited_by_country',)) -> pd.DataFrame:
+    """
+    Helper: Read only the needed columns of a citation file (CSV or Parquet),
+    with text columns as categoricals. Missing CSV columns are simply absent.
+    Default NA parsing is disabled so Namibia's code 'NA' is not read as missing.
+    """
+    if csv_filepath.lower().endswith('.parquet'):
+        return pd.read_parquet(csv_filepath, columns=list(columns))
+    return pd.read_csv(
+        csv_filepath,
+        usecols=lambda c: c in columns,
+        dtype={c: 'category' for c in columns if c != 'cited_by_year'},
+        keep_default_na=False,
+        na_values=['']
+    )
+
+
 def create_citation_map(
-    csv_filepath: str,
+    csv_filepath: str = None,
     output_filename: str = 'citation_map.png',
     # --- Data Scaling ---
     scale: str = 'linear', # 'linear', 'log', 'rank', 'log_rank'
@@ -44,10 +187,14 @@ def create_citation_map(
     label_top_n: int = None,
     show_legend: bool = False, # Show simple categorical legend
     base_color: str = '#EEEEEE',
-    border_color: str = '#FFFFFF'
+    border_color: str = '#FFFFFF',
+
+    # --- Precomputed Data ---
+    country_counts: np.ndarray = None # Counts aligned to load_world_map() rows; replaces csv_filepath
 ):
     """
     Generates a static map of citing countries based on a modular design.
+    Returns the saved filename, or None if no map was written.
     """
     
     # --- 0. Input Validation ---
@@ -65,56 +212,39 @@ def create_citation_map(
         output_filename = 'citation_map.png'
     
     # --- 1. Load Citation Data ---
-    try:
-        df = pd.read_csv(csv_filepath)
-        if 'cited_by_country' not in df.columns:
-            print(f"Error: CSV file must contain 'cited_by_country' column.")
+    df = None
+    if country_counts is None:
+        try:
+            df = _read_citation_csv(csv_filepath)
+            if 'cited_by_country' not in df.columns:
+                print(f"Error: CSV file must contain 'cited_by_country' column.")
+                return
+        except FileNotFoundError:
+            print(f"Error: File not found at '{csv_filepath}'")
+            return
+        except Exception as e:
+            print(f"Error loading CSV: {e}")
             return
-    except FileNotFoundError:
-        print(f"Error: File not found at '{csv_filepath}'")
-        return
-    except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return
 
     # --- 2. Load World Map ---
     try:
-        url = "https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip"
-        world = geopandas.read_file(url)
+        world = load_world_map()
     except Exception as e:
         print(f"Error loading world map dataset: {e}")
         return
 
-    # Robustness: Convert column names to lowercase
-    world.columns = world.columns.str.lower()
-    world = world[world.name != "Antarctica"] # Filter out Antarctica
-
-    # --- 3. Process Data and Merge ---
-    citation_counts = df['cited_by_country'].value_counts()
-    world = world.merge(
-        citation_counts.rename('count'), 
-        left_on='iso_a2', 
-        right_index=True, 
-        how='left'
-    )
-    world['count'] = world['count'].fillna(0).astype(int)
+    # --- 3. Process Data ---
+    if country_counts is None:
+        country_counts = compute_country_counts(df, world)
+    elif len(country_counts) != len(world):
+        print(f"Error: country_counts has {len(country_counts)} entries, expected {len(world)}.")
+        return
+
+    world = world.copy() # Keep the cached layer untouched
+    world['count'] = np.asarray(country_counts, dtype=np.int64)
     
     # --- 4. Global Scaling (The "Master" Value) ---
-    if scale == 'linear':
-        world['scaled_value'] = world['count']
-    elif scale == 'log':
-        world['scaled_value'] = np.log1p(world['count'])
-    elif scale == 'rank':
-        ranks = world['count'].rank(method='dense')
-        min_real_rank = ranks[world['count'] > 0].min() if ranks[world['count'] > 0].any() else 0
-        world['scaled_value'] = ranks - min_real_rank + 1
-        world.loc[world['count'] == 0, 'scaled_value'] = 0
-    elif scale == 'log_rank':
-        ranks = world['count'].rank(method='dense')
-        min_real_rank = ranks[world['count'] > 0].min() if ranks[world['count'] > 0].any() else 0
-        world['scaled_value'] = ranks - min_real_rank + 1
-        world.loc[world['count'] == 0, 'scaled_value'] = 0
-        world['scaled_value'] = np.log1p(world['scaled_value'])
+    world['scaled_value'] = _scale_counts(world['count'].to_numpy(), scale)
 
     # --- 5. Normalization (0-1) for scaling Alpha, Size, Color ---
     world['normalized_value'] = 0.0
@@ -135,47 +265,62 @@ def create_citation_map(
 
     # --- 6. Plotting ---
     print(f"Generating citation map ({output_filename})...")
-    fig, ax = plt.subplots(1, 1, figsize=(16, 9))
-
-    # 6a. Plot base map
-    world.plot(
-        ax=ax, 
-        color=base_color, 
-        edgecolor=border_color, 
-        linewidth=0.5
-    )
+    fig, ax = plt.subplots(1, 1, figsize=FIGURE_SIZE)
 
-    # 6b. Plot data based on fill_mode
-    if not cited_geometries.empty:
-        if fill_mode == 'simple':
-            cited_geometries.plot(
-                ax=ax,
-                color=fill_color,
-                edgecolor=border_color,
-                linewidth=0.5,
-                alpha=fill_alpha # Use configurable alpha
-            )
-        
-        elif fill_mode == 'alpha':
-            for _, row in cited_geometries.iterrows():
-                actual_alpha = 0.1 + row['normalized_value'] * 0.8 # Scale 0.1 to 0.9
-                geopandas.GeoSeries([row.geometry]).plot(
+    if file_extension in ['.svg', '.pdf']:
+        # 6a/b. Vector output: one simplified path per final fill color, no overlays
+        cited = world['count'].to_numpy() > 0
+        normalized = world['normalized_value'].to_numpy()
+        if fill_mode == 'heatmap' and cited.any():
+            # Match the raster heatmap, which normalizes scaled values over the cited countries
+            scaled = world['scaled_value'].to_numpy()
+            min_val, max_val = scaled[cited].min(), scaled[cited].max()
+            normalized = (scaled - min_val) / (max_val - min_val) if max_val > min_val else np.zeros(len(world))
+        _plot_vector_countries(
+            ax, world,
+            _country_facecolors(normalized, cited, fill_mode, fill_color, fill_alpha, fill_cmap, base_color),
+            border_color
+        )
+    else:
+        # 6a. Plot base map
+        world.plot(
+            ax=ax, 
+            color=base_color, 
+            edgecolor=border_color, 
+            linewidth=0.5
+        )
+
+        # 6b. Plot data based on fill_mode
+        if not cited_geometries.empty:
+            if fill_mode == 'simple':
+                cited_geometries.plot(
                     ax=ax,
                     color=fill_color,
                     edgecolor=border_color,
                     linewidth=0.5,
-                    alpha=actual_alpha
+                    alpha=fill_alpha # Use configurable alpha
                 )
+        
+            elif fill_mode == 'alpha':
+                for _, row in cited_geometries.iterrows():
+                    actual_alpha = 0.1 + row['normalized_value'] * 0.8 # Scale 0.1 to 0.9
+                    geopandas.GeoSeries([row.geometry]).plot(
+                        ax=ax,
+                        color=fill_color,
+                        edgecolor=border_color,
+                        linewidth=0.5,
+                        alpha=actual_alpha
+                    )
     
-        elif fill_mode == 'heatmap':
-            cited_geometries.plot(
-                ax=ax,
-                column='scaled_value',
-                cmap=fill_cmap,
-                edgecolor=border_color,
-                linewidth=0.5,
-                legend=False # No numeric legend, as requested
-            )
+            elif fill_mode == 'heatmap':
+                cited_geometries.plot(
+                    ax=ax,
+                    column='scaled_value',
+                    cmap=fill_cmap,
+                    edgecolor=border_color,
+                    linewidth=0.5,
+                    legend=False # No numeric legend, as requested
+                )
 
     # 6c. Add title and (optional) legend
     ax.set_axis_off()
@@ -298,11 +443,363 @@ def create_citation_map(
 
     # 6e. Save plot
     plt.tight_layout()
+    saved_filename = None
     try:
         plt.savefig(output_filename, dpi=300, bbox_inches='tight')
         print(f"Success! Citation map saved to: {output_filename}\n")
+        saved_filename = output_filename
     except Exception as e:
         print(f"Error saving citation map: {e}\n")
     plt.close(fig) # Close the figure to free up memory
+    return saved_filename
+
+
+# =============================================================================
+# TIME-SLICED (MULTI-FRAME) MAPS
+# =============================================================================
+
+def compute_yearly_country_counts(df: pd.DataFrame, world: geopandas.GeoDataFrame,
+                                  cumulative: bool = False) -> tuple:
+    """
+    Count citations per (year, country) in one grouped pass.
+    Returns (years, counts) where counts has shape (len(years), len(world)).
+    Every year between the first and last citing year gets a frame.
+    """
+    country_index = get_country_index(world)
+    # Look up each distinct code once, then index by the categorical codes
+    countries = df['cited_by_country'].astype('category')
+    category_positions = np.array(
+        [country_index.get(_normalize_country_code(code), -1) for code in countries.cat.categories] + [-1]
+    )
+    positions = pd.Series(category_positions[countries.cat.codes.to_numpy()], index=df.index) # Code -1 (missing) hits the trailing -1
+    years = pd.to_numeric(df['cited_by_year'], errors='coerce')
+    valid = (positions >= 0) & years.notna()
+    if not valid.any():
+        return [], np.zeros((0, len(world)), dtype=np.int64)
+
+    grouped = pd.DataFrame({
+        'year': years[valid].astype(int),
+        'pos': positions[valid]
+    }).groupby(['year', 'pos']).size()
+
+    year_values = grouped.index.get_level_values('year').to_numpy()
+    first_year, last_year = year_values.min(), year_values.max()
+    counts = np.zeros((last_year - first_year + 1, len(world)), dtype=np.int64)
+    counts[year_values - first_year, grouped.index.get_level_values('pos').to_numpy()] = grouped.to_numpy()
+
+    if cumulative:
+        counts = np.cumsum(counts, axis=0)
+    return list(range(first_year, last_year + 1)), counts
+
+
+def _country_paths(geometries) -> list:
+    """Helper: Build one compound matplotlib Path per country geometry (all parts and holes)."""
+    paths = []
+    for geom in geometries:
+        polygons = getattr(geom, 'geoms', [geom])
+        rings = []
+        for polygon in polygons:
+            if polygon.is_empty:
+                continue
+            rings.append(Path(np.asarray(polygon.exterior.coords)[:, :2], closed=True))
+            rings.extend(Path(np.asarray(interior.coords)[:, :2], closed=True) for interior in polygon.interiors)
+        paths.append(Path.make_compound_path(*rings) if rings else Path(np.empty((0, 2))))
+    return paths
+
+
+def _country_facecolors(normalized: np.ndarray, cited: np.ndarray, fill_mode: str,
+                        fill_color: str, fill_alpha: float, fill_cmap: str,
+                        base_color: str) -> np.ndarray:
+    """
+    Final opaque RGBA fill per country, i.e. the look of the cited layer
+    composited over the base layer, so each country needs only one patch.
+    """
+    base_rgba = np.array(mcolors.to_rgba(base_color))
+    colors = np.tile(base_rgba, (len(normalized), 1))
+    if not cited.any():
+        return colors
+
+    if fill_mode == 'heatmap':
+        colors[cited] = plt.get_cmap(fill_cmap)(normalized[cited])
+        return colors
+
+    if fill_mode == 'alpha':
+        alphas = 0.1 + normalized[cited] * 0.8 # Scale 0.1 to 0.9
+    else:
+        alphas = np.full(cited.sum(), fill_alpha)
+    fill_rgb = np.array(mcolors.to_rgb(fill_color))
+    colors[cited, :3] = alphas[:, None] * fill_rgb + (1 - alphas[:, None]) * base_rgba[:3]
+    return colors
 
 
+def _set_map_extent(ax, world: geopandas.GeoDataFrame):
+    """Helper: Fit the axes to the world layer, with the aspect geopandas uses for lat/lon."""
+    minx, miny, maxx, maxy = world.total_bounds
+    ax.set_xlim(minx, maxx)
+    ax.set_ylim(miny, maxy)
+    ax.set_aspect(1 / np.cos(np.radians((miny + maxy) / 2)))
+
+
+def _vector_simplify_tolerance(world: geopandas.GeoDataFrame) -> float:
+    """Helper: Map units covered by VECTOR_SIMPLIFY_POINTS at the figure's print width."""
+    minx, _, maxx, _ = world.total_bounds
+    points_per_unit = FIGURE_SIZE[0] * 72 / (maxx - minx)
+    return VECTOR_SIMPLIFY_POINTS / points_per_unit
+
+
+def _plot_vector_countries(ax, world: geopandas.GeoDataFrame, facecolors: np.ndarray, border_color: str):
+    """
+    Helper: Draw every country exactly once, for lean .svg/.pdf files.
+    Geometries are simplified to the print resolution and countries sharing a
+    final fill color are merged into one compound path.
+    """
+    simplified = world.geometry.simplify(_vector_simplify_tolerance(world), preserve_topology=True)
+    paths = _country_paths(simplified)
+
+    groups = {} # RGBA -> paths with that fill
+    for path, color in zip(paths, map(tuple, facecolors)):
+        if len(path.vertices):
+            groups.setdefault(color, []).append(path)
+
+    ax.add_collection(PathCollection(
+        [Path.make_compound_path(*group) for group in groups.values()],
+        facecolors=list(groups.keys()),
+        edgecolors=border_color,
+        linewidths=0.5
+    ))
+    _set_map_extent(ax, world)
+
+
+def create_citation_map_animation(
+    csv_filepath: str,
+    output_filename: str = 'citation_map.gif',
+    cumulative: bool = True, # Citations up to each year, or only within each year
+    fps: float = 2,
+    dpi: int = 100,
+    # --- Data Scaling & Fill Style (as in create_citation_map) ---
+    scale: str = 'linear',
+    fill_mode: str = 'heatmap',
+    fill_color: str = '#E63946',
+    fill_alpha: float = 1.0,
+    fill_cmap: str = 'YlOrRd',
+    # --- Pin Style (as in create_citation_map) ---
+    show_pins: bool = False,
+    pin_color: str = '#E63946',
+    pin_cmap: str = 'viridis',
+    pin_scale_color: bool = False,
+    pin_scale_size: bool = True,
+    pin_scale_alpha: bool = True,
+    pin_size_range: tuple = (20, 200),
+    pin_size_static: int = 50,
+    base_color: str = '#EEEEEE',
+    border_color: str = '#FFFFFF'
+):
+    """
+    Generates one map frame per citing year, as a GIF/MP4 animation or as an
+    image sequence (one file per year for .png/.jpg/.pdf/.svg outputs).
+    The base map is drawn once; each frame only updates fill colors and pins.
+    Scaling is normalized over all frames so colors are comparable across years.
+    """
+
+    # --- 0. Input Validation ---
+    if fill_mode not in ['heatmap', 'alpha', 'simple']:
+        print(f"Warning: Invalid fill_mode '{fill_mode}'. Defaulting to 'heatmap'.")
+        fill_mode = 'heatmap'
+    if scale not in ['linear', 'log', 'rank', 'log_rank']:
+        print(f"Warning: Invalid scale '{scale}'. Defaulting to 'linear'.")
+        scale = 'linear'
+
+    root, file_extension = os.path.splitext(output_filename)
+    file_extension = file_extension.lower()
+    if file_extension not in ['.gif', '.mp4', '.png', '.jpg', '.jpeg', '.pdf', '.svg']:
+        print(f"Warning: Output file '{output_filename}' is not a recognized animation or image format.")
+        print("Defaulting to 'citation_map.gif'")
+        root, file_extension = 'citation_map', '.gif'
+    if file_extension == '.mp4' and not animation.writers.is_available('ffmpeg'):
+        print("Error: Writing .mp4 requires ffmpeg. Use a .gif or image output instead.")
+        return
+
+    # --- 1. Load Citation Data & World Map ---
+    try:
+        df = _read_citation_csv(csv_filepath, columns=('cited_by_country', 'cited_by_year'))
+        if 'cited_by_year' not in df.columns or 'cited_by_country' not in df.columns:
+            print("Error: CSV file must contain 'cited_by_country' and 'cited_by_year' columns.")
+            return
+    except FileNotFoundError:
+        print(f"Error: File not found at '{csv_filepath}'")
+        return
+    except Exception as e:
+        print(f"Error loading CSV: {e}")
+        return
+
+    try:
+        world = load_world_map()
+    except Exception as e:
+        print(f"Error loading world map dataset: {e}")
+        return
+
+    # --- 2. Per-Frame Counts, Scaling and Normalization ---
+    years, frame_counts = compute_yearly_country_counts(df, world, cumulative=cumulative)
+    if not years:
+        print("Error: No citations with both a known country and a publication year.")
+        return
+
+    frame_cited = frame_counts > 0
+    frame_scaled = np.stack([_scale_counts(counts, scale) for counts in frame_counts])
+    frame_normalized = np.zeros(frame_scaled.shape)
+    min_val, max_val = frame_scaled[frame_cited].min(), frame_scaled[frame_cited].max()
+    if max_val == min_val:
+        frame_normalized[frame_cited] = 1.0 # All have same count
+    else:
+        frame_normalized[frame_cited] = (frame_scaled[frame_cited] - min_val) / (max_val - min_val)
+
+    # --- 3. Draw the Base Map Once ---
+    print(f"Generating {len(years)}-frame citation map ({root}{file_extension})...")
+    fig, ax = plt.subplots(1, 1, figsize=FIGURE_SIZE)
+
+    countries = PathCollection(
+        _country_paths(world.geometry),
+        facecolors=base_color,
+        edgecolors=border_color,
+        linewidths=0.5
+    )
+    ax.add_collection(countries)
+    _set_map_extent(ax, world)
+    ax.set_axis_off()
+    title = ax.set_title('', fontdict={'fontsize': '20', 'fontweight': 'bold'})
+
+    centroids = np.array([[c.x, c.y] if not c.is_empty else [np.nan, np.nan]
+                          for c in (geom.centroid for geom in world.geometry)])
+    pins = ax.scatter([], [], edgecolors='black', linewidth=0.5, zorder=10) if show_pins else None
+    if pin_scale_color:
+        pin_cmap_obj = plt.get_cmap(pin_cmap)
+    plt.tight_layout()
+
+    def draw_frame(i):
+        countries.set_facecolor(_country_facecolors(
+            frame_normalized[i], frame_cited[i], fill_mode,
+            fill_color, fill_alpha, fill_cmap, base_color
+        ))
+        period = f"up to {years[i]}" if cumulative else str(years[i])
+        title.set_text(f'Global Distribution of Citations ({period})')
+
+        if pins is not None:
+            # Largest pins first, so smaller ones stay visible on top
+            order = np.argsort(-frame_normalized[i], kind='stable')
+            order = order[frame_cited[i][order] & ~np.isnan(centroids[order, 0])]
+            normalized_val = frame_normalized[i][order]
+
+            if pin_scale_color:
+                pin_colors = pin_cmap_obj(normalized_val)
+            else:
+                pin_colors = np.tile(mcolors.to_rgba(pin_color), (len(order), 1))
+            pin_colors[:, 3] = (0.3 + normalized_val * 0.5) if pin_scale_alpha else 0.7
+            if pin_scale_size:
+                min_size, max_size = pin_size_range
+                pin_sizes = min_size + normalized_val * (max_size - min_size)
+            else:
+                pin_sizes = np.full(len(order), pin_size_static)
+
+            pins.set_offsets(centroids[order].reshape(-1, 2))
+            pins.set_sizes(pin_sizes)
+            pins.set_facecolor(pin_colors)
+        return [countries, title] + ([pins] if pins is not None else [])
+
+    # --- 4. Write Frames ---
+    try:
+        if file_extension in ['.gif', '.mp4']:
+            writer = animation.PillowWriter(fps=fps) if file_extension == '.gif' else animation.FFMpegWriter(fps=fps)
+            anim = animation.FuncAnimation(fig, draw_frame, frames=len(years), blit=False, repeat=False)
+            anim.save(f"{root}{file_extension}", writer=writer, dpi=dpi)
+            print(f"Success! Citation map animation saved to: {root}{file_extension}\n")
+        else:
+            for i, year in enumerate(years):
+                draw_frame(i)
+                fig.savefig(f"{root}_{year}{file_extension}", dpi=dpi)
+            print(f"Success! {len(years)} frames saved as: {root}_<year>{file_extension}\n")
+    except Exception as e:
+        print(f"Error saving citation map frames: {e}\n")
+    plt.close(fig) # Close the figure to free up memory
+
+
+# =============================================================================
+# PARALLEL RENDERING
+# =============================================================================
+
+def _init_map_worker(world: geopandas.GeoDataFrame):
+    """Pool initializer: install the parent's world layer as this worker's cache."""
+    global _WORLD_CACHE, _COUNTRY_INDEX_CACHE
+    import matplotlib
+    matplotlib.use('Agg') # Workers never need an interactive backend
+    _WORLD_CACHE = world
+    _COUNTRY_INDEX_CACHE = build_country_index(world)
+
+
+def _render_map_job(job: dict) -> str:
+    """Pool task: render one map from a precomputed count vector (None if it failed)."""
+    return create_citation_map(**job)
+
+
+def create_citation_maps_parallel(jobs: list, max_workers: int = None) -> list:
+    """
+    Render many citation maps (e.g. one per author or per style) in a process pool.
+
+    Each job is a dict of create_citation_map keyword arguments and must contain
+    'output_filename' plus either 'csv_filepath' or 'country_counts'. CSVs are
+    reduced to count vectors here, so workers only receive small arrays and the
+    world layer, which is loaded once and handed to each worker at start-up.
+    Returns the filenames of the maps that were actually written; failed
+    renders are left out of the result and the throughput figure.
+    """
+    try:
+        world = load_world_map()
+    except Exception as e:
+        print(f"Error loading world map dataset: {e}")
+        return []
+
+    prepared_jobs = []
+    for job in jobs:
+        job = dict(job)
+        csv_filepath = job.pop('csv_filepath', None)
+        if job.get('country_counts') is None:
+            try:
+                df = _read_citation_csv(csv_filepath)
+                if 'cited_by_country' not in df.columns:
+                    raise ValueError("missing 'cited_by_country' column")
+            except Exception as e:
+                print(f"Error loading CSV '{csv_filepath}': {e}. Skipping.")
+                continue
+            job['country_counts'] = compute_country_counts(df, world)
+        prepared_jobs.append(job)
+
+    if not prepared_jobs:
+        print("No maps to render.")
+        return []
+
+    print(f"Rendering {len(prepared_jobs)} citation maps in parallel...")
+    start_time = time.perf_counter()
+    rendered = []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_map_worker,
+        initargs=(world,)
+    ) as executor:
+        future_to_name = {
+            executor.submit(_render_map_job, job): job['output_filename']
+            for job in prepared_jobs
+        }
+        for future in concurrent.futures.as_completed(future_to_name):
+            try:
+                saved_filename = future.result()
+            except Exception as e:
+                print(f"Error rendering {future_to_name[future]}: {e}")
+                continue
+            if saved_filename:
+                rendered.append(saved_filename)
+            else:
+                print(f"Error rendering {future_to_name[future]}: no map was written.")
+
+    elapsed = time.perf_counter() - start_time
+    rate = len(rendered) / elapsed if elapsed > 0 else float('inf')
+    print(f"Rendered {len(rendered)}/{len(prepared_jobs)} maps in {elapsed:.1f}s ({rate:.2f} maps/s)\n")
+    return rendered
@@ -0,0 +1,236 @@
+import sqlite3
+import gzip
+import json
+import zlib
+import glob
+import os
+import time
+import threading
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, List, Dict, Any, Iterator
+
+# --- Configuration & Constants ---
+OPENALEX_ID_PREFIX = "https://openalex.org/"
+INSERT_BATCH_SIZE = 10000 # Works buffered before each write to the index
+
+# Pair tables are plain append-only tables during the build (snapshot order is
+# random with respect to their keys); their lookup indexes are created at the end.
+# Each pair carries the version (read sequence number) of the work record it came
+# from, so pairs from a replaced, older version of a work are ignored by queries.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    id INTEGER PRIMARY KEY,          -- numeric part of the OpenAlex work ID (W123 -> 123)
+    version INTEGER NOT NULL,        -- sequence number of the record that was kept
+    doi TEXT,                        -- lower-case DOI without the https://doi.org/ prefix
+    record BLOB NOT NULL             -- zlib-compressed JSON with the fields the fetcher uses
+);
+CREATE TABLE IF NOT EXISTS cites (   -- reverse citation index: cited work -> citing works
+    cited INTEGER NOT NULL,
+    citing INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS authorships (
+    author INTEGER NOT NULL,
+    work INTEGER NOT NULL,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS authors (
+    id INTEGER PRIMARY KEY,
+    display_name TEXT
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS works_doi ON works (doi);
+CREATE INDEX IF NOT EXISTS cites_cited ON cites (cited, citing, version);
+CREATE INDEX IF NOT EXISTS authorships_author ON authorships (author, work, version);
+"""
+
+
+def _numeric_id(openalex_id: Optional[str]) -> Optional[int]:
+    """Helper: 'https://openalex.org/W123' or 'W123' -> 123 (None if malformed)."""
+    if not openalex_id:
+        return None
+    short_id = openalex_id.strip().rsplit('/', 1)[-1]
+    try:
+        return int(short_id[1:])
+    except ValueError:
+        return None
+
+
+def _normalize_doi(doi: Optional[str]) -> str:
+    """Helper: Lower-case a DOI and strip the doi.org URL prefix."""
+    if not doi:
+        return ""
+    return doi.strip().lower().replace("https://doi.org/", "").replace("http://doi.org/", "")
+
+
+def compact_work(work: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the work fields used by CitationFetcher.run (for indexes and caches)."""
+    return {
+        'id': work.get('id'),
+        'doi': work.get('doi'),
+        'title': work.get('title'),
+        'publication_year': work.get('publication_year'),
+        'publication_date': work.get('publication_date'),
+        'cited_by_count': work.get('cited_by_count', 0),
+        'authorships': [
+            {
+                'author': {'display_name': (a.get('author') or {}).get('display_name')},
+                'institutions': [
+                    {'display_name': inst.get('display_name'), 'country_code': inst.get('country_code')}
+                    for inst in a.get('institutions') or []
+                ],
+            }
+            for a in work.get('authorships') or []
+        ],
+    }
+
+
+def _iter_snapshot_works(snapshot_dir: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream works from an OpenAlex snapshot, oldest partition first, so a
+    work that was updated later overwrites its earlier version.
+    Accepts the snapshot root or its 'data/works' folder.
+    """
+    works_dir = os.path.join(snapshot_dir, 'data', 'works')
+    if not os.path.isdir(works_dir):
+        works_dir = snapshot_dir
+    part_files = sorted(glob.glob(os.path.join(works_dir, '**', '*.gz'), recursive=True))
+    if not part_files:
+        raise FileNotFoundError(f"No .gz partition files found under {works_dir}")
+
+    for count, part_file in enumerate(part_files):
+        print(f"\rIndexing partition {count + 1}/{len(part_files)}: {part_file}", end='', flush=True)
+        with gzip.open(part_file, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    print()
+
+
+def build_snapshot_index(snapshot_dir: str, index_path: str) -> None:
+    """
+    Build the on-disk citation index for a local OpenAlex works snapshot
+    (partitioned JSONL.gz) in a single streaming pass.
+    The newest version of each work wins, including its references and authorships.
+    """
+    print(f"Building OpenAlex snapshot index {index_path} from {snapshot_dir}...")
+    start_time = time.perf_counter()
+    # Build into a temporary file, so an interrupted build never looks like a finished index
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    # A failed build is simply redone, so trade durability for speed
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+
+    works, cites, authorships, authors = [], [], [], []
+
+    def flush():
+        conn.executemany("INSERT OR REPLACE INTO works (id, version, doi, record) VALUES (?, ?, ?, ?)", works)
+        conn.executemany("INSERT INTO cites (cited, citing, version) VALUES (?, ?, ?)", cites)
+        conn.executemany("INSERT INTO authorships (author, work, version) VALUES (?, ?, ?)", authorships)
+        conn.executemany("INSERT OR REPLACE INTO authors (id, display_name) VALUES (?, ?)", authors)
+        conn.commit()
+        for batch in (works, cites, authorships, authors):
+            batch.clear()
+
+    total_works = 0
+    for work in _iter_snapshot_works(snapshot_dir):
+        work_id = _numeric_id(work.get('id'))
+        if work_id is None:
+            continue
+
+        total_works += 1
+        version = total_works
+        record = zlib.compress(json.dumps(compact_work(work), separators=(',', ':')).encode('utf-8'))
+        works.append((work_id, version, _normalize_doi(work.get('doi')) or None, record))
+        ref_ids = {_numeric_id(ref) for ref in work.get('referenced_works') or []}
+        cites.extend((ref_id, work_id, version) for ref_id in ref_ids if ref_id is not None)
+        author_ids = set()
+        for a in work.get('authorships') or []:
+            author = a.get('author') or {}
+            author_id = _numeric_id(author.get('id'))
+            if author_id is not None:
+                author_ids.add(author_id)
+                authors.append((author_id, author.get('display_name')))
+        authorships.extend((author_id, work_id, version) for author_id in author_ids)
+
+        if len(works) >= INSERT_BATCH_SIZE:
+            flush()
+    flush()
+
+    print("Creating DOI, citation and authorship indexes...")
+    conn.executescript(INDEXES)
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, index_path)
+    elapsed = time.perf_counter() - start_time
+    print(f"Indexed {total_works} works in {elapsed:.0f}s.\n")
+
+
+class OpenAlexSnapshot:
+    """
+    Read-only access to a snapshot index built by build_snapshot_index.
+    Answers the OpenAlex API queries CitationFetcher makes (DOI, author and
+    'cites:' filters, plus author lookups) locally, in the API's JSON shape.
+    """
+
+    def __init__(self, index_path: str):
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Snapshot index not found: {index_path}")
+        # Threads may share the fetcher, so allow cross-thread use of this read-only connection
+        self.conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _load_works(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        """Helper: Run a query returning work records and decode them."""
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(zlib.decompress(row[0])) for row in rows]
+
+    def get_author(self, author_id: str, api_url: str) -> Optional[Dict[str, Any]]:
+        """Return a minimal OpenAlex author object, or None if the author is unknown."""
+        numeric_id = _numeric_id(author_id)
+        with self._lock:
+            row = self.conn.execute("SELECT display_name FROM authors WHERE id = ?", (numeric_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': f"{OPENALEX_ID_PREFIX}A{numeric_id}",
+            'display_name': row[0],
+            'works_api_url': f"{api_url}/works?filter=author.id:A{numeric_id}",
+        }
+
+    def get_works(self, url: str) -> List[Dict[str, Any]]:
+        """
+        Answer an OpenAlex /works URL with a single 'doi:', 'author.id:' or
+        'cites:' filter from the local index (all pages at once).
+        """
+        query = parse_qs(urlparse(url).query)
+        filter_value = (query.get('filter') or [''])[0]
+        key, _, value = filter_value.partition(':')
+
+        if key == 'doi':
+            dois = [_normalize_doi(d) for d in value.split('|') if d.strip()]
+            placeholders = ','.join('?' * len(dois))
+            return self._load_works(f"SELECT record FROM works WHERE doi IN ({placeholders})", tuple(dois))
+        if key in ('author.id', 'authorships.author.id'):
+            return self._load_works(
+                "SELECT w.record FROM authorships a JOIN works w ON w.id = a.work AND w.version = a.version "
+                "WHERE a.author = ?",
+                (_numeric_id(value),)
+            )
+        if key == 'cites':
+            return self._load_works(
+                "SELECT w.record FROM cites c JOIN works w ON w.id = c.citing AND w.version = c.version "
+                "WHERE c.cited = ?",
+                (_numeric_id(value),)
+            )
+        raise ValueError(f"Unsupported filter for the local snapshot: '{filter_value}'")
+
+    def close(self):
+        self.conn.close()
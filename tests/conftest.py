@@ -0,0 +1,40 @@
+import os
+import sys
+
+import geopandas
+import pytest
+from shapely.geometry import box
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import create_citation_map
+
+
+@pytest.fixture
+def world(monkeypatch):
+    """Small synthetic world layer installed as the cached map (no download)."""
+    countries = [
+        # name, iso_a2, iso_a2_eh, adm0_a3
+        ("France", "-99", "FR", "FRA"),
+        ("Norway", "-99", "NO", "NOR"),
+        ("United States of America", "US", "US", "USA"),
+        ("China", "CN", "CN", "CHN"),
+        ("Namibia", "NA", "NA", "NAM"),
+        # Its iso_a2_eh fallback must not take 'SO' from the later row's real iso_a2
+        ("Somaliland", "-99", "SO", "SOL"),
+        ("Somalia", "SO", "SO", "SOM"),
+    ]
+    world = geopandas.GeoDataFrame(
+        {
+            'name': [c[0] for c in countries],
+            'iso_a2': [c[1] for c in countries],
+            'iso_a2_eh': [c[2] for c in countries],
+            'adm0_a3': [c[3] for c in countries],
+            'geometry': [box(i * 40 - 170, 0, i * 40 - 140, 30) for i in range(len(countries))],
+        },
+        crs="EPSG:4326",
+    )
+    monkeypatch.setattr(create_citation_map, '_WORLD_CACHE', world)
+    monkeypatch.setattr(create_citation_map, '_COUNTRY_INDEX_CACHE', create_citation_map.build_country_index(world))
+    return world
@@ -0,0 +1,174 @@
+import pandas as pd
+import pytest
+
+import citation_fetcher as cf
+from create_citation_map import _read_citation_csv
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def fetcher(tmp_path, monkeypatch):
+    """Fetcher with a temporary Scholar cache, a fake Scholar and a fake Crossref."""
+    fetcher = cf.CitationFetcher(scholar_cache_dir=str(tmp_path))
+    fetcher.crossref_queries = []
+    fetcher.scholar_titles = ["Known Paper Title", "Unmatched Paper Title"]
+
+    def crossref_get(url, params=None, **kwargs):
+        fetcher.crossref_queries.append(params['query.title'])
+        if params['query.title'].startswith("Unmatched"):
+            return FakeResponse({'message': {'items': []}})
+        return FakeResponse({'message': {'items': [{'DOI': '10.1/known', 'title': [params['query.title']]}]}})
+
+    def fill(author, sections=None):
+        author['publications'] = [{'bib': {'title': t}} for t in fetcher.scholar_titles]
+        return author
+
+    fetcher.session.get = crossref_get
+    monkeypatch.setattr(cf.scholarly, 'search_author_id', lambda scholar_id: {})
+    monkeypatch.setattr(cf.scholarly, 'fill', fill)
+    return fetcher
+
+
+def scholar_round(fetcher):
+    """One Phase-1 pass of run() for a Scholar profile."""
+    data = fetcher._resolve_missing_dois(fetcher._fetch_scholar_data('abc'))
+    fetcher._save_scholar_cache('abc', data)
+    return data
+
+
+def test_unmatched_titles_are_not_requeried_from_fresh_cache(fetcher):
+    data = scholar_round(fetcher)
+    assert data[1] == ["Unmatched Paper Title", "", cf.CROSSREF_NOT_FOUND]
+    assert len(fetcher.crossref_queries) == 2
+
+    scholar_round(fetcher)
+    assert len(fetcher.crossref_queries) == 2
+
+
+def test_expired_cache_only_resolves_new_and_unresolved_titles(fetcher):
+    scholar_round(fetcher)
+    fetcher.scholar_cache_ttl = 0
+    fetcher.scholar_titles.append("Brand New Paper Title")
+
+    data = scholar_round(fetcher)
+    assert sorted(fetcher.crossref_queries[2:]) == ["Brand New Paper Title", "Unmatched Paper Title"]
+    assert data[0][1] == '10.1/known'
+
+
+def test_failed_crossref_request_is_retried(fetcher):
+    fetcher.session.get = lambda url, params=None, **kwargs: FakeResponse({}, status_code=503)
+    data = fetcher._resolve_missing_dois([["Some Paper Title", "", ""]])
+    assert data[0] == ["Some Paper Title", "", ""]
+
+
+def filled_store():
+    store = cf.CitationRowStore()
+    store.append("Paper A", "Citing 1", "Ada", "Lab", "NA", 2020, "2020-01-02")
+    store.append("Paper A", "Citing 1", "Grace", None, None, None, "2020-01-02")
+    store.append("Paper B", "Citing 2", "Ada", "Lab", "US", 0, None)
+    return store
+
+
+def test_row_store_interns_values():
+    store = filled_store()
+    assert len(store) == 3
+    assert store._categories['my_publication'] == ["Paper A", "Paper B"]
+    assert list(store._codes['cited_by_author']) == [0, 1, 0]
+    assert list(store._codes['cited_by_institution']) == [0, -1, 0] # None -> -1
+
+
+def test_row_store_dataframe_dtypes_and_missing_values():
+    df = filled_store().to_dataframe()
+    assert list(df.columns) == cf.CITATION_COLUMNS
+    for col in cf.CitationRowStore.STRING_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+    assert df['cited_by_year'].dtype == 'Int64'
+    assert df['cited_by_year'].tolist() == [2020, pd.NA, pd.NA] # None and 0 are missing years
+    assert pd.isna(df['cited_by_country'].iloc[1])
+    assert df['cited_by_author'].tolist() == ["Ada", "Grace", "Ada"]
+
+
+def test_row_store_csv_round_trip(tmp_path):
+    csv_path = str(tmp_path / "citations.csv")
+    filled_store().to_dataframe().to_csv(csv_path, index=False, encoding='utf-8-sig')
+    df = _read_citation_csv(csv_path, columns=('cited_by_country', 'cited_by_year'))
+    assert isinstance(df['cited_by_country'].dtype, pd.CategoricalDtype)
+    assert df['cited_by_country'].tolist()[::2] == ["NA", "US"] # Namibia is not read as missing
+    assert pd.isna(df['cited_by_country'].iloc[1])
+    assert df['cited_by_year'].iloc[0] == 2020 and df['cited_by_year'].iloc[1:].isna().all()
+
+
+def test_row_store_parquet_round_trip(tmp_path):
+    pytest.importorskip('pyarrow')
+    parquet_path = str(tmp_path / "citations.parquet")
+    filled_store().to_dataframe().to_parquet(parquet_path, index=False)
+    df = _read_citation_csv(parquet_path, columns=('cited_by_country', 'cited_by_year'))
+    assert isinstance(df['cited_by_country'].dtype, pd.CategoricalDtype)
+    assert df['cited_by_year'].dtype == 'Int64'
+    assert df['cited_by_country'].tolist()[::2] == ["NA", "US"]
+
+
+ORCID_ID = "0000-0002-1825-0097"
+
+
+def summary(put_code, title, doi=None):
+    ids = [{'external-id-type': 'doi', 'external-id-value': doi}] if doi else []
+    return {'put-code': put_code, 'title': {'title': {'value': title}}, 'external-ids': {'external-id': ids}}
+
+
+def fake_orcid(fetcher, groups, bulk_dois):
+    """Route the fetcher's ORCID requests to canned responses; returns the requested URLs."""
+    urls = []
+
+    def get(url, headers=None, **kwargs):
+        urls.append(url)
+        if url.endswith("/works"):
+            return FakeResponse({'group': groups})
+        put_codes = [int(pc) for pc in url.rsplit('/', 1)[-1].split(',')]
+        return FakeResponse({'bulk': [
+            {'work': {'put-code': pc, **summary(pc, "", bulk_dois.get(pc))}} if pc in bulk_dois
+            else {'error': {'response-code': 404}}
+            for pc in put_codes
+        ]})
+
+    fetcher.session.get = get
+    return urls
+
+
+def test_orcid_doi_from_later_summary(fetcher):
+    groups = [{'external-ids': {'external-id': []},
+               'work-summary': [summary(1, "Preprint"), summary(2, "Journal Version", "10.1/later")]}]
+    urls = fake_orcid(fetcher, groups, {})
+    assert fetcher._fetch_orcid_data(ORCID_ID) == [["Preprint", "10.1/later", "ORCID"]]
+    assert len(urls) == 1 # No bulk request needed
+
+
+def test_orcid_doi_from_bulk_works(fetcher):
+    groups = [{'work-summary': [summary(1, "Paper"), summary(2, "Paper (copy)")]},
+              {'work-summary': [summary(3, "No DOI Anywhere")]}]
+    urls = fake_orcid(fetcher, groups, {2: "10.1/bulk"})
+    assert fetcher._fetch_orcid_data(ORCID_ID) == [
+        ["Paper", "10.1/bulk", "ORCID"],
+        ["No DOI Anywhere", "", "ORCID"],
+    ]
+    assert urls[1] == f"{cf.ORCID_API_URL}/{ORCID_ID}/works/1,2,3"
+
+
+def test_orcid_bulk_requests_are_batched(fetcher):
+    groups = [{'work-summary': [summary(pc, f"Paper {pc}")]} for pc in range(1, 151)]
+    urls = fake_orcid(fetcher, groups, {pc: f"10.1/{pc}" for pc in range(1, 151)})
+    data = fetcher._fetch_orcid_data(ORCID_ID)
+    assert [row[1] for row in data] == [f"10.1/{pc}" for pc in range(1, 151)]
+    batches = [url.rsplit('/', 1)[-1].split(',') for url in urls[1:]]
+    assert [len(batch) for batch in batches] == [cf.ORCID_BULK_SIZE, 150 - cf.ORCID_BULK_SIZE]
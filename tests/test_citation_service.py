@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+import requests
+
+import citation_fetcher as cf
+import citation_service as cs
+
+ORCID_ID = "0000-0002-1825-0097"
+
+CITING_WORK = {
+    'id': "https://openalex.org/W9",
+    'title': "Citing Paper",
+    'publication_year': 2021,
+    'publication_date': "2021-05-01",
+    'abstract_inverted_index': {'long': [0], 'abstract': [1]}, # Not used by run(), so never cached
+    'authorships': [
+        {'author': {'id': "https://openalex.org/A7", 'display_name': "Grace Hopper"},
+         'institutions': [{'display_name': "Yale", 'country_code': "US", 'ror': "x"}]},
+        {'author': {'display_name': "Marie Curie"},
+         'institutions': [{'display_name': "Sorbonne", 'country_code': "FR"}]},
+    ],
+}
+MY_WORKS = {
+    '10.1/orcid': {'id': "https://openalex.org/W1", 'doi': "https://doi.org/10.1/orcid",
+                   'title': "ORCID Paper", 'cited_by_count': 1},
+    '10.1/crossref': {'id': "https://openalex.org/W2", 'doi': "https://doi.org/10.1/crossref",
+                      'title': "Crossref Paper", 'cited_by_count': 1},
+}
+
+
+class StandInAPI(BaseHTTPRequestHandler):
+    """Answers the OpenAlex, ORCID and Crossref requests the fetcher makes."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append(self.path)
+        base = f"http://127.0.0.1:{self.server.server_port}"
+
+        if url.path == '/openalex/authors/A1':
+            payload = {'display_name': "Ada Lovelace",
+                       'works_api_url': f"{base}/openalex/works?filter=author.id:A1"}
+        elif url.path == '/openalex/works':
+            key, _, value = query['filter'][0].partition(':')
+            if key == 'author.id':
+                results = list(MY_WORKS.values())
+            elif key == 'doi':
+                results = [MY_WORKS[doi] for doi in value.split('|') if doi in MY_WORKS]
+            else: # cites:
+                results = [CITING_WORK]
+            payload = {'results': results, 'meta': {'next_cursor': None}}
+        elif url.path == f'/orcid/{ORCID_ID}/works':
+            payload = {'group': [
+                {'work-summary': [{'put-code': 1, 'title': {'title': {'value': "ORCID Paper"}},
+                                   'external-ids': {'external-id': [
+                                       {'external-id-type': 'doi', 'external-id-value': '10.1/orcid'}]}}]},
+                {'work-summary': [{'put-code': 2, 'title': {'title': {'value': "Crossref Paper"}}}]},
+            ]}
+        elif url.path == f'/orcid/{ORCID_ID}/works/2':
+            payload = {'bulk': [{'work': {'put-code': 2}}]}
+        elif url.path == '/crossref':
+            payload = {'message': {'items': [{'DOI': '10.1/crossref', 'title': [query['query.title'][0]]}]}}
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Stand-in upstream APIs, with the fetcher's base URLs pointed at them."""
+    server = start_server(StandInAPI)
+    server.requests = []
+    for name in ('OPENALEX_API_URL', 'ORCID_API_URL', 'CROSSREF_API_URL'):
+        monkeypatch.setattr(cf, name, getattr(cf, name)) # Restored after the test
+    base = f"http://127.0.0.1:{server.server_port}"
+    cs.configure_upstreams(f"{base}/openalex/", f"{base}/orcid", f"{base}/crossref")
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def service(world, upstream, tmp_path):
+    fetcher = cf.CitationFetcher(scholar_cache_dir=str(tmp_path))
+    fetcher.session.trust_env = False # Never send local requests through a proxy
+    service = cs.CitationService(fetcher, num_workers=1)
+    server = start_server(cs.make_handler(service))
+    service.url = f"http://127.0.0.1:{server.server_port}"
+    yield service
+    server.shutdown()
+
+
+def wait_for(service, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{service.url}/jobs/{job_id}").json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_configure_upstreams_strips_trailing_slash(upstream):
+    assert cf.OPENALEX_API_URL.endswith('/openalex')
+    assert cf.ORCID_API_URL.endswith('/orcid')
+    assert cf.CROSSREF_API_URL.endswith('/crossref')
+
+
+def test_fetch_jobs_against_stand_in_apis(service, upstream, tmp_path):
+    orcid_job = {'type': 'fetch', 'source_type': 'orcid', 'source_value': ORCID_ID,
+                 'output': str(tmp_path / "orcid.csv")}
+    openalex_job = {'type': 'fetch', 'source_type': 'openalex', 'source_value': "A1",
+                    'output': str(tmp_path / "openalex.csv")}
+
+    # Queue before any worker runs, so the duplicate is always coalesced
+    first = requests.post(f"{service.url}/jobs", json=orcid_job)
+    duplicate = requests.post(f"{service.url}/jobs", json=orcid_job)
+    assert (first.status_code, duplicate.status_code) == (202, 200)
+    assert duplicate.json()['id'] == first.json()['id']
+    second = requests.post(f"{service.url}/jobs", json=openalex_job)
+    service.start()
+
+    for job_id in (first.json()['id'], second.json()['id']):
+        job = wait_for(service, job_id)
+        assert job['status'] == 'done', job['error']
+
+    orcid_rows = pd.read_csv(tmp_path / "orcid.csv")
+    assert sorted(orcid_rows['my_publication'].unique()) == ["Crossref Paper", "ORCID Paper"]
+    assert sorted(orcid_rows['cited_by_country'].unique()) == ["FR", "US"]
+    publications = pd.read_csv(tmp_path / "orcid_publications.csv", encoding='utf-8-sig')
+    assert publications.set_index('my_publication')['DOI'].to_dict() == {
+        "Crossref Paper": "10.1/crossref", "ORCID Paper": "10.1/orcid"}
+
+    openalex_rows = pd.read_csv(tmp_path / "openalex.csv")
+    assert len(openalex_rows) == len(orcid_rows) == 4
+
+    # Both jobs cite the same works, so the second one is served from the cache
+    cites_requests = [path for path in upstream.requests if 'filter=cites' in path]
+    assert len(cites_requests) == 2
+
+    cache = service.fetcher.response_cache
+    cached = cache.get(f"{cf.OPENALEX_API_URL}/works?filter=cites:W1")
+    assert cached[0]['authorships'][0] == {'author': {'display_name': "Grace Hopper"},
+                                           'institutions': [{'display_name': "Yale", 'country_code': "US"}]}
+    assert 'abstract_inverted_index' not in cached[0]
+
+    metrics = requests.get(f"{service.url}/metrics").json()
+    assert metrics['completed'] == 2 and metrics['coalesced'] == 1
+    assert metrics['response_cache_bytes'] == cache.total_bytes > 0
+
+
+def test_response_cache_evicts_to_byte_budget():
+    value = ["x" * 40]
+    size = cs._approximate_size(value)
+    cache = cs.LRUCache(max_bytes=size * 2, ttl=60)
+    cache['a'] = value
+    cache['b'] = value
+    cache.get('a') # 'b' is now least recently used
+    cache['c'] = value
+    assert cache.get('b') is None and cache.get('a') == value and cache.get('c') == value
+    assert cache.total_bytes == size * 2
+
+    cache['huge'] = ["x" * 1000] # Larger than the whole budget: not cached
+    assert cache.get('huge') is None and len(cache) == 2
+
+
+def test_fetches_for_same_author_share_one_run(service, upstream, tmp_path):
+    specs = [{'type': 'fetch', 'source_type': 'openalex', 'source_value': "A1",
+              'output': str(tmp_path / name)} for name in ("alice.csv", "alice_copy.csv")]
+    first = requests.post(f"{service.url}/jobs", json=specs[0]).json()
+    joined = requests.post(f"{service.url}/jobs", json=specs[1]).json()
+    assert joined['coalesced'] and joined['id'] == first['id']
+    assert joined['outputs'] == [specs[0]['output'], specs[1]['output']]
+    service.start()
+
+    job = wait_for(service, first['id'])
+    assert job['status'] == 'done', job['error']
+    assert (tmp_path / "alice.csv").read_bytes() == (tmp_path / "alice_copy.csv").read_bytes()
+    assert (tmp_path / "alice_copy_publications.csv").exists()
+    assert sum(path.startswith('/openalex/authors/') for path in upstream.requests) == 1
+
+
+def test_failed_fetch_returns_false(upstream, tmp_path):
+    fetcher = cf.CitationFetcher(scholar_cache_dir=str(tmp_path))
+    fetcher.session.trust_env = False
+    assert fetcher.run('openalex', "A404", str(tmp_path / "out.csv")) is False
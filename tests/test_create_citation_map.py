@@ -0,0 +1,141 @@
+import matplotlib.colors as mcolors
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.collections import PathCollection
+
+import create_citation_map as ccm
+
+
+def test_country_index_falls_back_for_minus_99_codes(world):
+    index = ccm.get_country_index(world)
+    assert index['FR'] == 0
+    assert index['NO'] == 1
+    assert index['NA'] == 4
+
+
+def test_country_index_prefers_iso_a2_over_earlier_fallbacks(world):
+    # Somaliland (row 5) lists 'SO' only as its iso_a2_eh fallback; Somalia (row 6) has it as iso_a2
+    assert ccm.get_country_index(world)['SO'] == 6
+    df = pd.DataFrame({'cited_by_country': ['SO']})
+    assert ccm.compute_country_counts(df, world).tolist() == [0, 0, 0, 0, 0, 0, 1]
+
+
+def test_compute_country_counts_normalizes_and_scatters(world):
+    df = pd.DataFrame({'cited_by_country': ['US', 'us ', 'FR', 'NO', 'XK', 'N/A']})
+    counts = ccm.compute_country_counts(df, world)
+    assert counts.tolist() == [1, 1, 2, 0, 0, 0, 0]
+
+
+def test_compute_country_counts_empty_input(world):
+    df = pd.DataFrame({'cited_by_country': pd.Series([], dtype=object)})
+    counts = ccm.compute_country_counts(df, world)
+    assert counts.dtype == np.int64
+    assert counts.tolist() == [0] * len(world)
+
+
+def test_header_only_csv_renders_empty_map(world, tmp_path):
+    csv_path = tmp_path / "citations.csv"
+    csv_path.write_text("cited_by_country\n")
+    output = str(tmp_path / "map.png")
+    assert ccm.create_citation_map(str(csv_path), output_filename=output) == output
+
+
+def test_namibia_code_survives_csv_read(world, tmp_path):
+    csv_path = tmp_path / "citations.csv"
+    csv_path.write_text("cited_by_country\nNA\nN/A\n")
+    counts = ccm.compute_country_counts(ccm._read_citation_csv(str(csv_path)), world)
+    assert counts.tolist() == [0, 0, 0, 0, 1, 0, 0]
+
+
+def test_parallel_driver_skips_failed_renders(world, tmp_path):
+    good = str(tmp_path / "good.png")
+    bad = str(tmp_path / "bad.png")
+    rendered = ccm.create_citation_maps_parallel(
+        [
+            {'country_counts': np.array([1, 0, 3, 0, 2, 0, 0]), 'output_filename': good},
+            {'country_counts': np.array([1, 2, 3]), 'output_filename': bad}, # Wrong length
+        ],
+        max_workers=2,
+    )
+    assert rendered == [good]
+
+
+YEARLY_CITATIONS = pd.DataFrame({
+    'cited_by_country': ['FR', 'US', 'US', 'us', 'CN', 'FR', 'XK', 'N/A', None],
+    'cited_by_year': [2018, 2018, 2020, 2020, 2021, None, 2015, 2023, 2024],
+})
+
+
+def test_yearly_counts_per_year(world):
+    years, counts = ccm.compute_yearly_country_counts(YEARLY_CITATIONS, world)
+    # Unknown/missing countries and years are dropped; 2019 has no citations but keeps its frame
+    assert years == [2018, 2019, 2020, 2021]
+    assert counts.tolist() == [
+        [1, 0, 1, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 2, 0, 0, 0, 0],
+        [0, 0, 0, 1, 0, 0, 0],
+    ]
+
+
+def test_yearly_counts_cumulative(world):
+    years, counts = ccm.compute_yearly_country_counts(YEARLY_CITATIONS, world, cumulative=True)
+    assert years == [2018, 2019, 2020, 2021]
+    assert counts.tolist() == [
+        [1, 0, 1, 0, 0, 0, 0],
+        [1, 0, 1, 0, 0, 0, 0],
+        [1, 0, 3, 0, 0, 0, 0],
+        [1, 0, 3, 1, 0, 0, 0],
+    ]
+
+
+def test_yearly_counts_without_usable_rows(world):
+    df = pd.DataFrame({'cited_by_country': ['XK', 'FR'], 'cited_by_year': [2020, None]})
+    years, counts = ccm.compute_yearly_country_counts(df, world)
+    assert years == []
+    assert counts.shape == (0, len(world))
+
+
+def test_animation_writes_one_image_per_year(world, tmp_path):
+    csv_path = tmp_path / "citations.csv"
+    YEARLY_CITATIONS.to_csv(csv_path, index=False)
+    ccm.create_citation_map_animation(str(csv_path), output_filename=str(tmp_path / "frames.png"), dpi=20)
+    assert sorted(p.name for p in tmp_path.glob("frames*")) == [
+        "frames_2018.png", "frames_2019.png", "frames_2020.png", "frames_2021.png"]
+
+
+@pytest.mark.parametrize('fill_mode, distinct_colors', [('heatmap', 3), ('alpha', 3), ('simple', 2)])
+def test_vector_output_draws_one_path_per_fill_color(world, tmp_path, monkeypatch, fill_mode, distinct_colors):
+    drawn = {}
+    plot_vector_countries = ccm._plot_vector_countries
+
+    def record(ax, world, facecolors, border_color):
+        plot_vector_countries(ax, world, facecolors, border_color)
+        drawn.update(ax=ax, facecolors=facecolors)
+
+    monkeypatch.setattr(ccm, '_plot_vector_countries', record)
+    output = str(tmp_path / f"{fill_mode}.svg")
+    # France and Namibia share a count, so they share a fill
+    assert ccm.create_citation_map(country_counts=np.array([1, 0, 3, 0, 1, 0, 0]), output_filename=output,
+                                   fill_mode=fill_mode) == output
+
+    collections = [c for c in drawn['ax'].collections if isinstance(c, PathCollection)]
+    assert len(collections) == 1
+    assert len(collections[0].get_paths()) == distinct_colors
+    assert len({tuple(c) for c in drawn['facecolors']}) == distinct_colors
+    assert (tmp_path / f"{fill_mode}.svg").stat().st_size > 0
+
+
+@pytest.mark.parametrize('fill_mode', ['alpha', 'simple'])
+def test_facecolors_composite_fill_over_base(fill_mode):
+    normalized = np.array([0.0, 0.5, 1.0, 0.0])
+    cited = np.array([True, True, True, False])
+    colors = ccm._country_facecolors(normalized, cited, fill_mode, '#E63946', 0.4, 'YlOrRd', '#EEEEEE')
+
+    fill = np.array(mcolors.to_rgb('#E63946'))
+    base = np.array(mcolors.to_rgb('#EEEEEE'))
+    alphas = 0.1 + normalized[cited] * 0.8 if fill_mode == 'alpha' else np.full(3, 0.4)
+    np.testing.assert_allclose(colors[cited, :3], alphas[:, None] * fill + (1 - alphas[:, None]) * base)
+    np.testing.assert_allclose(colors[~cited], [mcolors.to_rgba('#EEEEEE')])
+    assert (colors[:, 3] == 1.0).all() # Opaque, so no overlay is needed
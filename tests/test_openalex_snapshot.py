@@ -0,0 +1,110 @@
+import gzip
+import json
+
+import pandas as pd
+import pytest
+
+import citation_fetcher as cf
+from openalex_snapshot import OpenAlexSnapshot, build_snapshot_index
+
+
+def work(work_id, title, doi=None, authors=(), references=(), year=2020, cited_by_count=0):
+    return {
+        'id': f"https://openalex.org/{work_id}",
+        'doi': f"https://doi.org/{doi}" if doi else None,
+        'title': title,
+        'publication_year': year,
+        'publication_date': f"{year}-01-01",
+        'cited_by_count': cited_by_count,
+        'referenced_works': [f"https://openalex.org/{ref}" for ref in references],
+        'authorships': [
+            {'author': {'id': f"https://openalex.org/{author_id}", 'display_name': name},
+             'institutions': [{'display_name': inst, 'country_code': country, 'ror': "unused"}]}
+            for author_id, name, inst, country in authors
+        ],
+    }
+
+
+ADA = ("A1", "Ada Lovelace", "Analytical Engine Lab", "GB")
+GRACE = ("A2", "Grace Hopper", "Yale", "US")
+MARIE = ("A3", "Marie Curie", "Sorbonne", "FR")
+
+PARTITIONS = {
+    # Oldest partition first: W3 is replaced by a newer version below
+    'updated_date=2024-01-01': [
+        work("W1", "My Paper", doi="10.1/MINE", authors=[ADA], cited_by_count=2),
+        work("W3", "Draft Citing Paper", authors=[MARIE, GRACE], references=["W1", "W2"]),
+    ],
+    'updated_date=2024-02-01': [
+        work("W2", "Other Paper", doi="10.1/other", authors=[ADA]),
+        work("W4", "Citing Paper", authors=[GRACE], references=["W1", "W1"], year=2022),
+        # Newer version drops the reference to W2 and the second author
+        work("W3", "Citing Paper 2", authors=[MARIE], references=["W1"], year=2023),
+    ],
+}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    for partition, works in PARTITIONS.items():
+        part_dir = tmp_path / "snapshot" / "data" / "works" / partition
+        part_dir.mkdir(parents=True)
+        with gzip.open(part_dir / "part_000.gz", 'wt', encoding='utf-8') as f:
+            f.writelines(json.dumps(w) + "\n" for w in works)
+    index_path = str(tmp_path / "index.sqlite")
+    build_snapshot_index(str(tmp_path / "snapshot"), index_path)
+    snapshot = OpenAlexSnapshot(index_path)
+    yield snapshot
+    snapshot.close()
+
+
+def titles(works):
+    return sorted(w['title'] for w in works)
+
+
+def test_doi_query(snapshot):
+    works = snapshot.get_works(f"{cf.OPENALEX_API_URL}/works?filter=doi:10.1/mine|https://doi.org/10.1/other")
+    assert titles(works) == ["My Paper", "Other Paper"]
+    assert works[0]['authorships'][0]['institutions'] == [
+        {'display_name': "Analytical Engine Lab", 'country_code': "GB"}]
+
+
+def test_author_query_uses_latest_version(snapshot):
+    assert titles(snapshot.get_works("https://api.openalex.org/works?filter=author.id:A1")) == ["My Paper", "Other Paper"]
+    assert titles(snapshot.get_works("https://api.openalex.org/works?filter=author.id:A3")) == ["Citing Paper 2"]
+    # Grace was dropped from the newer version of W3
+    assert titles(snapshot.get_works("https://api.openalex.org/works?filter=author.id:A2")) == ["Citing Paper"]
+
+
+def test_cites_query_drops_stale_references(snapshot):
+    assert titles(snapshot.get_works("https://api.openalex.org/works?filter=cites:W1")) == ["Citing Paper", "Citing Paper 2"]
+    assert snapshot.get_works("https://api.openalex.org/works?filter=cites:W2") == []
+
+
+def test_get_author(snapshot):
+    author = snapshot.get_author("A1", "https://api.example.org")
+    assert author == {'id': "https://openalex.org/A1", 'display_name': "Ada Lovelace",
+                      'works_api_url': "https://api.example.org/works?filter=author.id:A1"}
+    assert snapshot.get_author("A99", "https://api.example.org") is None
+
+
+def test_unsupported_filter(snapshot):
+    with pytest.raises(ValueError):
+        snapshot.get_works("https://api.openalex.org/works?filter=title.search:paper")
+
+
+def test_fetch_openalex_author_offline(snapshot, tmp_path):
+    fetcher = cf.CitationFetcher(snapshot=snapshot, scholar_cache_dir=str(tmp_path))
+    output = tmp_path / "citations.csv"
+    assert fetcher.run('openalex', "A1", str(output), pub_list_filename=str(tmp_path / "pubs.csv")) is True
+
+    publications = pd.read_csv(tmp_path / "pubs.csv", encoding='utf-8-sig')
+    assert publications.set_index('my_publication')['DOI'].to_dict() == {
+        "My Paper": "10.1/MINE", "Other Paper": "10.1/other"}
+
+    rows = pd.read_csv(output, encoding='utf-8-sig')
+    assert set(rows['my_publication']) == {"My Paper"}
+    assert sorted(zip(rows['cited_by_title'], rows['cited_by_author'], rows['cited_by_country'])) == [
+        ("Citing Paper", "Grace Hopper", "US"),
+        ("Citing Paper 2", "Marie Curie", "FR"),
+    ]